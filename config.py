@@ -23,7 +23,13 @@ class Config:
     METADATA_PATH_DAYS = os.getenv("METADATA_PATH_DAYS", "models/waktu_tanam_metadata.json")
     WAKTU_MODEL_PATH = os.getenv("WAKTU_MODEL_PATH", "models/waktu_tanam_xgb_reg.pkl")
 
-    # Urutan fitur default (boleh dioverride oleh metadata saat runtime)
+    # ===== Registry multi-model (per lokasi_tanam), lihat myapp/registry.py =====
+    MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+    MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "512"))      # estimasi dari ukuran file artefak
+    MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", "8"))
+
+    # Urutan fitur default model (boleh dioverride oleh metadata saat runtime);
+    # daftar kolom sensor di DB ada di myapp.models.SENSOR_COLS
     FEATURE_NAMES = [
         "suhu_udara", "kelembapan_udara", "suhu_tanah", "kelembapan_tanah",
         "ph_tanah", "nitrogen", "fosfor", "kalium", "curah_hujan"
@@ -31,3 +37,55 @@ class Config:
 
     # izinkan metadata menimpa FEATURE_NAMES
     ALLOW_METADATA_FEATURES_OVERRIDE = True
+
+    # ===== Ingest streaming NDJSON (/api/ingest) =====
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))          # baris per micro-batch
+    INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "1.0"))  # umur maks. batch
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "2048"))         # baris tertunda sebelum backpressure
+    INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", "16384"))
+    INGEST_MAX_STREAMS = int(os.getenv("INGEST_MAX_STREAMS", "2"))          # koneksi ingest terbuka per worker (tiap stream memegang satu thread)
+    LATEST_RESYNC_SECONDS = float(os.getenv("LATEST_RESYNC_SECONDS", "30"))  # /api/latest: sinkron cache dari DB
+
+    # ===== Time-series grafik (/api/timeseries) =====
+    TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", "5000"))  # batas titik hasil LTTB
+    TIMESERIES_FETCH_SIZE = int(os.getenv("TIMESERIES_FETCH_SIZE", "5000"))  # baris per batch baca DB
+
+    # ===== Monitoring drift (/api/drift) =====
+    DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH", "models/status_reference.json")
+    DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))  # PSI >= 0.2 dianggap drift
+    DRIFT_MIN_SAMPLES = int(os.getenv("DRIFT_MIN_SAMPLES", "100"))        # minimal prediksi (semua worker) sebelum flag
+    DRIFT_PUBLISH_SECONDS = float(os.getenv("DRIFT_PUBLISH_SECONDS", "10"))  # interval tulis hitungan worker ke instance/drift/
+
+    # ===== Export PDF (/laporan/export.pdf) =====
+    PDF_FETCH_SIZE = int(os.getenv("PDF_FETCH_SIZE", "2000"))      # baris per chunk baca DB
+    PDF_ROWS_PER_PAGE = int(os.getenv("PDF_ROWS_PER_PAGE", "40"))   # maks. baris per segmen/halaman
+
+    # ===== Admission control route inferensi (/api/admission) =====
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))      # per proses/worker
+    ADMISSION_RESERVED_INTERACTIVE = int(os.getenv("ADMISSION_RESERVED_INTERACTIVE", "1"))
+    # antrean hanya bisa diisi thread worker yang tidak sedang memegang slot
+    # atau stream ingest, jadi default-nya thread gunicorn (gunicorn.conf.py)
+    # dikurangi batas konkurensi dan INGEST_MAX_STREAMS
+    GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", str(
+        max(0, GUNICORN_THREADS - ADMISSION_MAX_CONCURRENT - INGEST_MAX_STREAMS))))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))    # detik
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))            # header Retry-After
+
+    # ===== Shadow/canary model kandidat (/api/shadow) =====
+    SHADOW_MODEL_KEY = os.getenv("SHADOW_MODEL_KEY", "")              # key classifier di registry; kosong = mati
+    SHADOW_DAYS_MODEL_KEY = os.getenv("SHADOW_DAYS_MODEL_KEY", "")    # key regressor kandidat (opsional)
+    SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))  # porsi request yang diskor ulang
+    SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))     # penuh -> sampel dibuang
+    SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "64"))
+    SHADOW_FLUSH_SECONDS = float(os.getenv("SHADOW_FLUSH_SECONDS", "1.0"))
+    SHADOW_PUBLISH_SECONDS = float(os.getenv("SHADOW_PUBLISH_SECONDS", "10"))  # interval tulis statistik worker ke instance/shadow/
+
+    # ===== Diagnostik memori worker (/api/diag/*, khusus admin) =====
+    ADMIN_USERNAMES = [u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()]
+    DIAG_CHECK_SECONDS = float(os.getenv("DIAG_CHECK_SECONDS", "30"))  # interval cek RSS & tulis instance/diag/
+    DIAG_TOP_N = int(os.getenv("DIAG_TOP_N", "25"))                    # baris top tipe objek / lokasi alokasi
+    DIAG_TRACEMALLOC_FRAMES = int(os.getenv("DIAG_TRACEMALLOC_FRAMES", "10"))
+    DIAG_MAX_SNAPSHOTS = int(os.getenv("DIAG_MAX_SNAPSHOTS", "4"))     # snapshot tracemalloc disimpan per worker
+    WORKER_MAX_RSS_MB = int(os.getenv("WORKER_MAX_RSS_MB", "0"))       # >0: worker gunicorn recycle di atas batas
@@ -0,0 +1,45 @@
+# gunicorn.conf.py
+"""
+Konfigurasi gunicorn produksi (dibaca otomatis bila gunicorn dijalankan
+dari root repo):  gunicorn "app:app"
+
+Worker gthread: admission control (myapp/admission.py) mengantre & menolak
+request di dalam tiap worker, jadi worker harus punya beberapa thread.
+Dengan worker sync hanya satu request per worker yang pernah masuk, dan
+antrean menumpuk di depan worker seperti sebelumnya.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))  # juga dipakai config.py untuk default ADMISSION_QUEUE_SIZE
+
+
+def when_ready(server):
+    """Peringatkan kombinasi worker/threads yang membuat admission control tidak berfungsi."""
+    from config import Config
+
+    if not Config.ADMISSION_ENABLED:
+        return
+    cfg = server.cfg
+    limit, queue_size = Config.ADMISSION_MAX_CONCURRENT, Config.ADMISSION_QUEUE_SIZE
+    streams = Config.INGEST_MAX_STREAMS
+    if cfg.worker_class_str != "gthread" or cfg.threads <= 1:
+        server.log.warning(
+            "admission: worker '%s' dengan %d thread hanya memproses satu request per worker; "
+            "antrean/shedding ADMISSION_* tidak akan pernah aktif. Pakai worker gthread (--threads N).",
+            cfg.worker_class_str, cfg.threads)
+        return
+    if streams >= cfg.threads:
+        server.log.warning(
+            "admission: INGEST_MAX_STREAMS=%d >= %d thread; stream ingest yang terbuka bisa "
+            "memakai semua thread worker sehingga request dashboard antre di gunicorn.",
+            streams, cfg.threads)
+    reachable = max(0, cfg.threads - limit - streams)
+    if queue_size > reachable:
+        server.log.warning(
+            "admission: ADMISSION_QUEUE_SIZE=%d tidak tercapai; dengan %d thread, "
+            "ADMISSION_MAX_CONCURRENT=%d dan INGEST_MAX_STREAMS=%d paling banyak %d request "
+            "menunggu per worker (shedding 'queue_full' tidak akan terjadi).",
+            queue_size, cfg.threads, limit, streams, reachable)
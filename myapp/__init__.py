@@ -50,9 +50,43 @@ def create_app(config_object="config.Config"):
     from .auth import auth_bp
     from .dashboard import dash_bp
     from .main import main_bp
+    from .ingest import ingest_bp
+    from .timeseries import ts_bp
+    from .drift import drift_bp
+    from .admission import admission_bp
+    from .shadow import shadow_bp
+    from .diagnostics import diag_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(dash_bp)
+    app.register_blueprint(ingest_bp)
+    app.register_blueprint(ts_bp)
+    app.register_blueprint(drift_bp)
+    app.register_blueprint(admission_bp)
+    app.register_blueprint(shadow_bp)
+    app.register_blueprint(diag_bp)
+
+    # CLI: flask rescore
+    from .rescore import rescore_command
+    app.cli.add_command(rescore_command)
+
+    # CLI: flask create-indexes
+    # create_all tidak menambah index ke tabel yang sudah ada. DDL sengaja tidak
+    # dijalankan di startup (tiap worker gunicorn akan membangun index yang sama
+    # bersamaan); jalankan sekali per deploy.
+    @app.cli.command("create-indexes")
+    def create_indexes():
+        """Buat index model yang belum ada di database."""
+        import click
+        from .models import PredictionRecord
+        existing = {ix["name"] for ix in db.inspect(db.engine).get_indexes(PredictionRecord.__tablename__)}
+        for ix in PredictionRecord.__table__.indexes:
+            if ix.name in existing:
+                click.echo(f"{ix.name}: sudah ada")
+                continue
+            click.echo(f"{ix.name}: membuat index ...")
+            ix.create(bind=db.engine)
+            click.echo(f"{ix.name}: selesai")
 
     # Buat tabel jika belum ada
     with app.app_context():
@@ -0,0 +1,208 @@
+# myapp/admission.py
+"""
+Admission control & load shedding untuk route inferensi.
+
+Per proses ada batas jumlah request inferensi yang berjalan bersamaan
+(ADMISSION_MAX_CONCURRENT) dan antrean tunggu berukuran tetap. Request yang
+tidak kebagian slot dalam ADMISSION_QUEUE_TIMEOUT detik, atau datang saat
+antrean penuh, langsung dijawab 503 + Retry-After.
+
+Dua kelas prioritas:
+- "interactive": form dashboard/prediksi dari pengguna (didahulukan)
+- "machine":     /api/predict, /api/ingest dari perangkat; hanya boleh
+                 memakai slot di luar ADMISSION_RESERVED_INTERACTIVE dan
+                 selalu mengalah bila ada request interaktif yang menunggu.
+
+Catatan: antrean in-process hanya bermakna bila worker punya banyak thread
+(gunicorn --threads N / worker gthread). Worker sync hanya memproses satu
+request sekaligus.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required
+from werkzeug.exceptions import ServiceUnavailable
+
+admission_bp = Blueprint("admission", __name__)
+
+PRIORITIES = ("interactive", "machine")
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(self, limit: int, queue_size: int, timeout: float, reserved_interactive: int = 1):
+        self.limit = max(1, int(limit))
+        self.queue_size = max(0, int(queue_size))
+        self.timeout = max(0.0, float(timeout))
+        # minimal satu slot tetap tersedia untuk mesin
+        self.reserved = max(0, min(int(reserved_interactive), self.limit - 1))
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = {p: 0 for p in PRIORITIES}
+        self._admitted = {p: 0 for p in PRIORITIES}
+        self._shed = {p: {"queue_full": 0, "timeout": 0} for p in PRIORITIES}
+        self._wait_total = {p: 0.0 for p in PRIORITIES}
+        self._max_depth = 0
+
+    def _can_run(self, priority: str) -> bool:
+        if priority == "interactive":
+            return self._active < self.limit
+        return self._waiting["interactive"] == 0 and self._active < self.limit - self.reserved
+
+    def acquire(self, priority: str, block: bool = False) -> None:
+        """
+        Ambil satu slot; raise Overloaded bila ditolak. block=True menunggu
+        tanpa batas waktu & tanpa batas antrean (dipakai batch ingest yang
+        memang harus ditahan, bukan dibuang).
+        """
+        t0 = time.monotonic()
+        with self._cond:
+            if self._can_run(priority) and not self._waiting[priority]:
+                self._active += 1
+                self._admitted[priority] += 1
+                return
+
+            # interactive punya jatah antrean sendiri; machine berbagi sisa
+            depth = self._waiting[priority] if priority == "interactive" else sum(self._waiting.values())
+            if not block and depth >= self.queue_size:
+                self._shed[priority]["queue_full"] += 1
+                raise Overloaded("queue_full")
+
+            self._waiting[priority] += 1
+            self._max_depth = max(self._max_depth, sum(self._waiting.values()))
+            deadline = None if block else t0 + self.timeout
+            try:
+                while not self._can_run(priority):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._shed[priority]["timeout"] += 1
+                        raise Overloaded("timeout")
+                    self._cond.wait(remaining)
+                self._active += 1
+                self._admitted[priority] += 1
+                self._wait_total[priority] += time.monotonic() - t0
+            finally:
+                self._waiting[priority] -= 1
+                # request mesin yang tertahan oleh antrean interaktif perlu dicek ulang
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str, block: bool = False):
+        self.acquire(priority, block=block)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "reserved_interactive": self.reserved,
+                "queue_size": self.queue_size,
+                "queue_timeout_s": self.timeout,
+                "active": self._active,
+                "queue_depth": dict(self._waiting, total=sum(self._waiting.values())),
+                "max_queue_depth": self._max_depth,
+                "admitted": dict(self._admitted),
+                "shed": {p: dict(v, total=sum(v.values())) for p, v in self._shed.items()},
+                "avg_wait_ms": {
+                    p: round(1000 * self._wait_total[p] / self._admitted[p], 2) if self._admitted[p] else 0.0
+                    for p in PRIORITIES
+                },
+            }
+
+
+# ---------- instance per proses ----------
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController | None:
+    """None bila ADMISSION_ENABLED=false."""
+    global _controller
+    cfg = current_app.config
+    if not cfg.get("ADMISSION_ENABLED", True):
+        return None
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    limit=cfg.get("ADMISSION_MAX_CONCURRENT", 4),
+                    queue_size=cfg.get("ADMISSION_QUEUE_SIZE", 16),
+                    timeout=cfg.get("ADMISSION_QUEUE_TIMEOUT", 2.0),
+                    reserved_interactive=cfg.get("ADMISSION_RESERVED_INTERACTIVE", 1),
+                )
+    return _controller
+
+
+def shed_response(priority: str, reason: str):
+    retry_after = int(current_app.config.get("ADMISSION_RETRY_AFTER", 5))
+    if priority == "machine":
+        resp = jsonify(ok=False, error="Server sedang sibuk, coba lagi nanti.", reason=reason)
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(retry_after)
+        return resp
+    raise ServiceUnavailable("Server sedang sibuk, silakan coba lagi sebentar lagi.", retry_after=retry_after)
+
+
+def admission_required(priority: str):
+    """
+    Dekorator route inferensi. GET/HEAD (render halaman) tidak dibatasi,
+    hanya method yang menjalankan model.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority harus salah satu dari {PRIORITIES}")
+
+    def deco(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            ctl = get_admission_controller()
+            if ctl is None or request.method in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            try:
+                ctl.acquire(priority)
+            except Overloaded as e:
+                return shed_response(priority, e.reason)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                ctl.release()
+        return wrapped
+    return deco
+
+
+@contextmanager
+def inference_slot(priority: str, block: bool = False):
+    """Slot untuk kerja inferensi di luar view biasa (mis. batch stream ingest)."""
+    ctl = get_admission_controller()
+    if ctl is None:
+        yield
+        return
+    with ctl.slot(priority, block=block):
+        yield
+
+
+# =================== ROUTES ===================
+
+@admission_bp.get("/api/admission")
+@login_required
+def api_admission():
+    ctl = get_admission_controller()
+    if ctl is None:
+        return jsonify(ok=True, enabled=False)
+    return jsonify(ok=True, enabled=True, **ctl.stats())
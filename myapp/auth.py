@@ -1,11 +1,30 @@
 # myapp/auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from functools import wraps
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from .extensions import db, bcrypt
 from .models import User
 
 auth_bp = Blueprint("auth", __name__)
 
+
+def is_admin(user) -> bool:
+    """Admin = username tercantum di ADMIN_USERNAMES (kosong = tidak ada admin)."""
+    return bool(getattr(user, "is_authenticated", False)) and \
+        user.username in (current_app.config.get("ADMIN_USERNAMES") or ())
+
+
+def admin_required(view):
+    """Seperti login_required, lalu 403 (JSON) untuk pengguna non-admin."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not is_admin(current_user):
+            return jsonify(ok=False, error="Khusus admin."), 403
+        return view(*args, **kwargs)
+    return wrapped
+
 @auth_bp.get("/login")
 def login():
     if current_user.is_authenticated:
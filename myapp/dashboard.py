@@ -2,28 +2,20 @@ from flask import Blueprint, render_template, request, current_app, jsonify, fla
 from flask_login import login_required, current_user
 from .extensions import db
 from .models import PredictionRecord
+from .latest import latest_readings
+from .drift import observe_prediction
+from .admission import admission_required
+from .registry import get_model_registry, UnknownModel
+from .shadow import shadow_submit
 
-import os, json, io, csv, datetime as dt
+import io, csv, tempfile, time, datetime as dt
 import numpy as np
-import joblib
 
 from datetime import datetime, date
 
 dash_bp = Blueprint("dash", __name__)
 
-# cache model biar gak load berulang
-_model_cache = {"clf": None, "reg": None, "meta_clf": {}, "meta_reg": {}}
-
 # ---------- helpers umum ----------
-def _load_meta(path: str) -> dict:
-    if not path or not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-    
 # helper: parse tanggal input (yyyy-mm-dd) -> date; default today
 def _parse_start_date(s: str | None) -> dt.date:
     if not s:
@@ -138,6 +130,21 @@ def _predict_status(pipe, X, meta) -> str:
     except Exception:
         return str(y_hat)
 
+def _predict_status_batch(pipe, X, meta) -> list:
+    """Versi batch dari _predict_status: satu panggilan predict untuk N baris."""
+    y_hat = pipe.predict(X)
+    classes = meta.get("classes") or []
+    out = []
+    for y in y_hat:
+        if isinstance(y, str):
+            out.append(y)
+            continue
+        try:
+            out.append(classes[int(y)])
+        except Exception:
+            out.append(str(y))
+    return out
+
 def _rule_waktu_tanam(status: str) -> int:
     s = (status or "").strip().lower()
     if s in ("sangat subur", "subur"):
@@ -146,124 +153,147 @@ def _rule_waktu_tanam(status: str) -> int:
         return 90
     return 120
 
-def _find_days_model_path() -> str | None:
+_missing_days_keys = set()  # key regressor yang filenya tidak ada (sudah di-log)
+
+def get_days_regressor(lokasi: str | None = None, model_key: str | None = None):
     """
-    Cari file model regressor dari beberapa kandidat:
-    - dari config (MODEL_PATH_DAYS / WAKTU_MODEL_PATH)
-    - default XGB
-    - default RF
+    Regressor hari tanam untuk lokasi/key; (None, {}) bila dimatikan atau
+    file modelnya tidak ada. File yang hilang hanya berlaku untuk key itu,
+    lokasi lain tetap memakai regressor masing-masing.
     """
-    candidates = [
-        current_app.config.get("MODEL_PATH_DAYS"),
-        current_app.config.get("WAKTU_MODEL_PATH"),
-        "models/waktu_tanam_xgb_reg.pkl",
-        "models/waktu_tanam_rf_reg.pkl",
-    ]
-    for p in candidates:
-        if p and os.path.exists(p):
-            return p
-    return None
-
-def _compute_waktu_tanam(status: str, X: np.ndarray) -> int:
-    use_reg = bool(current_app.config.get("USE_DAYS_REGRESSOR", False))
-    meta_path = current_app.config.get("METADATA_PATH_DAYS") or "models/waktu_tanam_metadata.json"
-
-    if not use_reg:
-        return _rule_waktu_tanam(status)
-
-    if _model_cache["reg"] is None:
-        mdl_path = _find_days_model_path()
-        if mdl_path:
-            try:
-                _model_cache["reg"] = joblib.load(mdl_path)
-            except ModuleNotFoundError as e:
-                # xgboost belum terpasang saat unpickle
-                if "xgboost" in str(e).lower():
-                    raise ModuleNotFoundError(
-                        "Model regressor membutuhkan paket 'xgboost'. "
-                        "Tambahkan ke requirements & install: pip install xgboost"
-                    ) from e
-                raise
-            _model_cache["meta_reg"] = _load_meta(meta_path)
-        else:
-            current_app.config["USE_DAYS_REGRESSOR"] = False
-            return _rule_waktu_tanam(status)
-
-    reg = _model_cache["reg"]
-    try:
-        days = float(reg.predict(X)[0])
-        return int(max(1.0, min(365.0, round(days))))
-    except Exception:
-        return _rule_waktu_tanam(status)
-
-# ---------- load classifier ----------
-def get_status_model():
-    if _model_cache["clf"] is None:
-        mdl_path = current_app.config.get("MODEL_PATH", "models/status_rf_clf.pkl")
-        meta_path = current_app.config.get("METADATA_PATH", "models/status_metadata.json")
+    if not current_app.config.get("USE_DAYS_REGRESSOR", False):
+        return None, {}
+    registry = get_model_registry()
+    key = registry.resolve("reg", lokasi, model_key)
+    if not registry.exists(key):
+        if key not in _missing_days_keys:
+            _missing_days_keys.add(key)
+            current_app.logger.warning("regressor hari %r tidak ditemukan, pakai aturan status", key)
+        return None, {}
+    return registry.get(key)
 
-        if not os.path.exists(mdl_path):
-            raise FileNotFoundError(f"Model file not found: {mdl_path}")
+def _days_matrix(reg, reg_meta: dict, srcs: list) -> np.ndarray:
+    """Matriks input regressor dengan urutan fitur regressor itu sendiri (bukan urutan classifier)."""
+    feats = _model_features(reg, reg_meta)
+    return np.array([[_collect_vals(feats, src).get(name) for name in feats] for src in srcs], dtype=float)
 
+def _predict_days_batch(reg, X: np.ndarray, labels: list) -> list:
+    """Prediksi hari dari X (urutan fitur regressor); fallback ke aturan per label."""
+    if reg is not None:
         try:
-            pipe = joblib.load(mdl_path)
-        except ModuleNotFoundError as e:
-            if "xgboost" in str(e).lower():
-                raise ModuleNotFoundError(
-                    "Model classifier membutuhkan paket 'xgboost'. "
-                    "Tambahkan ke requirements & install: pip install xgboost"
-                ) from e
-            raise
-
-        meta = _load_meta(meta_path)
-
-        # pastikan classifier
-        last_est = _last_estimator(pipe)
-        is_classifier = (meta.get("model_kind") == "classifier") or hasattr(last_est, "classes_")
-        if not is_classifier:
-            raise TypeError(
-                f"Model di '{mdl_path}' bukan classifier. Pastikan metadata 'model_kind'='classifier'."
-            )
-
-        # tentukan urutan fitur
-        feats_meta  = meta.get("features")
-        feats_model = _safe_feature_names_in(pipe)
-        feats_cfg   = list(current_app.config.get("FEATURE_NAMES") or [])
-
-        if   feats_meta: chosen = feats_meta
-        elif feats_model: chosen = feats_model
-        elif feats_cfg:   chosen = feats_cfg
-        else:
-            raise ValueError("Tidak bisa menentukan urutan fitur (metadata/pipe/config kosong).")
-
-        if current_app.config.get("ALLOW_METADATA_FEATURES_OVERRIDE", True):
-            current_app.config["FEATURE_NAMES"] = chosen
-
-        _model_cache["clf"] = pipe
-        _model_cache["meta_clf"] = meta
-
-    return _model_cache["clf"], _model_cache["meta_clf"]
+            days = np.clip(np.round(reg.predict(X).astype(float)), 1.0, 365.0)
+            return [int(d) for d in days]
+        except Exception:
+            current_app.logger.warning("regressor hari gagal, pakai aturan status", exc_info=True)
+    return [_rule_waktu_tanam(lbl) for lbl in labels]
+
+def _compute_waktu_tanam(status: str, src, lokasi: str | None = None, model_key: str | None = None) -> int:
+    return _compute_waktu_tanam_batch([status], [src], lokasi, model_key)[0]
+
+def _compute_waktu_tanam_batch(labels: list, srcs: list, lokasi: str | None = None, model_key: str | None = None) -> list:
+    """
+    Versi batch dari _compute_waktu_tanam: regressor dipanggil sekali untuk
+    semua input, fallback ke aturan per label bila tidak tersedia.
+    srcs: sumber nilai per baris (request.form / dict JSON), punya .get.
+    """
+    reg, reg_meta = get_days_regressor(lokasi, model_key)
+    if reg is None:
+        return [_rule_waktu_tanam(lbl) for lbl in labels]
+    return _predict_days_batch(reg, _days_matrix(reg, reg_meta, srcs), labels)
+
+def _score_batch(items: list) -> list:
+    """
+    Skor banyak input sekaligus, dikelompokkan per pasangan model (hasil
+    routing lokasi / key eksplisit) sehingga tiap model cukup satu predict.
+    items: list[(lokasi, model_key, days_key, src)], src punya .get.
+    Return list[(vals_model, label, days)] dengan urutan sama seperti items.
+    """
+    registry = get_model_registry()
+    groups = {}
+    for i, (lokasi, mkey, dkey, _) in enumerate(items):
+        ck = registry.resolve("clf", lokasi, mkey)
+        rk = registry.resolve("reg", lokasi, dkey)
+        groups.setdefault((ck, rk), []).append(i)
+
+    out = [None] * len(items)
+    for (ck, rk), idxs in groups.items():
+        clf, meta = get_status_model(model_key=ck)
+        feats = _model_features(clf, meta)
+        vals = [_collect_vals(feats, items[i][3]) for i in idxs]
+        X = np.array([[v.get(name) for name in feats] for v in vals], dtype=float)
+        labels = _predict_status_batch(clf, X, meta)
+        days = _compute_waktu_tanam_batch(labels, [items[i][3] for i in idxs], model_key=rk)
+        for i, v, lbl, d in zip(idxs, vals, labels, days):
+            out[i] = (v, lbl, d)
+    return out
+
+def _remember_latest(lokasi, vals_db: dict, label: str, rekom: str, days: int, tanggal_iso: str) -> None:
+    """Simpan hasil prediksi terakhir per lokasi ke cache in-memory (tanpa query DB)."""
+    latest_readings.update(lokasi, vals_db, {
+        "status_kesuburan": label,
+        "rekomendasi": rekom,
+        "waktu_tanam_hari": int(days),
+        "waktu_tanam_tanggal": tanggal_iso,
+    })
+
+# ---------- load classifier ----------
+def _model_features(pipe, meta: dict) -> list:
+    """Urutan fitur model: metadata -> feature_names_in_ -> config."""
+    feats_meta  = meta.get("features")
+    feats_model = _safe_feature_names_in(pipe)
+    feats_cfg   = list(current_app.config.get("FEATURE_NAMES") or [])
+
+    if   feats_meta: return list(feats_meta)
+    elif feats_model: return feats_model
+    elif feats_cfg:   return feats_cfg
+    raise ValueError("Tidak bisa menentukan urutan fitur (metadata/pipe/config kosong).")
+
+def _check_classifier(pipe, meta: dict, key: str) -> None:
+    """Dipanggil registry sekali saat classifier dimuat."""
+    last_est = _last_estimator(pipe)
+    is_classifier = (meta.get("model_kind") == "classifier") or hasattr(last_est, "classes_")
+    if not is_classifier:
+        raise TypeError(
+            f"Model '{key}' bukan classifier. Pastikan metadata 'model_kind'='classifier'."
+        )
+    chosen = _model_features(pipe, meta)
+    # FEATURE_NAMES global mengikuti model default (model lain pakai fiturnya sendiri)
+    if key == get_model_registry().default.get("clf") and current_app.config.get("ALLOW_METADATA_FEATURES_OVERRIDE", True):
+        current_app.config["FEATURE_NAMES"] = chosen
+
+def get_status_model(lokasi: str | None = None, model_key: str | None = None):
+    """Classifier untuk lokasi/key (lihat registry.py); dimuat lazily ke cache LRU."""
+    registry = get_model_registry()
+    key = registry.resolve("clf", lokasi, model_key)
+    if key is None:
+        raise FileNotFoundError("Tidak ada model classifier terdaftar.")
+    return registry.get(key, on_load=_check_classifier)
 
 # =================== ROUTES ===================
 
 @dash_bp.route("/dashboard", methods=["GET", "POST"])
 @login_required
+@admission_required("interactive")
 def dashboard():
     if request.method == "GET":
         return render_template("dashboard.html")
 
-    feats = current_app.config["FEATURE_NAMES"]
     f = request.form
 
     lokasi = (f.get("lokasi_tanam") or "").strip() or None
 
+    # model dipilih per lokasi (registry), urutan fitur ikut model tsb
+    clf, meta = get_status_model(lokasi)
+    feats = _model_features(clf, meta)
+
     # ambil nilai versi fitur-model (boleh beda nama dengan form)
     vals_model = _collect_vals(feats, f)
     X = np.array([[vals_model.get(name, np.nan) for name in feats]], dtype=float)
 
-    clf, meta = get_status_model()
+    t0 = time.perf_counter()
     label = _predict_status(clf, X, meta)
-    days  = _compute_waktu_tanam(label, X)
+    days  = _compute_waktu_tanam(label, f, lokasi)
+    latency = time.perf_counter() - t0
     rekom = _build_rekomendasi(label, vals_model)
 
     # konversi ke kolom DB
@@ -285,6 +315,9 @@ def dashboard():
     )
     db.session.add(rec)
     db.session.commit()
+    _remember_latest(lokasi, vals_db, label, rekom, days, target_date_iso)
+    observe_prediction(vals_db, label)
+    shadow_submit(vals_model, vals_db, label, days, latency, lokasi)
     flash("Prediksi tersimpan.", "success")
 
     return render_template(
@@ -301,20 +334,31 @@ def dashboard():
 
 @dash_bp.post("/api/predict")
 @login_required
+@admission_required("machine")
 def api_predict():
     data = request.get_json(silent=True) or {}
-    feats = current_app.config["FEATURE_NAMES"]
 
     lokasi = (data.get("lokasi_tanam") or "").strip() or None
     start_str = (data.get("tanggal_input") or "").strip() or None
     start_date = _parse_start_date(start_str)
+    # opsional: pilih model eksplisit (key registry), default ikut routing lokasi
+    model_key = (data.get("model") or "").strip() or None
+    days_key = (data.get("model_days") or "").strip() or None
+
+    try:
+        clf, meta = get_status_model(lokasi, model_key)
+        get_days_regressor(lokasi, days_key)
+    except UnknownModel as e:
+        return jsonify(ok=False, error=f"Model tidak dikenal: {e.args[0]}"), 400
+    feats = _model_features(clf, meta)
 
     vals_model = _collect_vals(feats, data)
     X = np.array([[vals_model.get(name, np.nan) for name in feats]], dtype=float)
 
-    clf, meta = get_status_model()
+    t0 = time.perf_counter()
     label = _predict_status(clf, X, meta)
-    days  = _compute_waktu_tanam(label, X)
+    days  = _compute_waktu_tanam(label, data, lokasi, days_key)
+    latency = time.perf_counter() - t0
     rekom = _build_rekomendasi(label, vals_model)
 
     target_date = start_date + dt.timedelta(days=int(days))
@@ -333,6 +377,9 @@ def api_predict():
         **vals_db
     )
     db.session.add(rec); db.session.commit()
+    _remember_latest(lokasi, vals_db, label, rekom, days, target_date_iso)
+    observe_prediction(vals_db, label)
+    shadow_submit(vals_model, vals_db, label, days, latency, lokasi, days_key)
 
     return jsonify(
         ok=True,
@@ -348,53 +395,35 @@ def api_predict():
 @dash_bp.get("/debug/model")
 @login_required
 def debug_model():
-    clf, meta = get_status_model()
-    feats = current_app.config["FEATURE_NAMES"]
+    lokasi = (request.args.get("lokasi") or "").strip() or None
+    registry = get_model_registry()
+    clf, meta = get_status_model(lokasi)
+    feats = _model_features(clf, meta)
     last = _last_estimator(clf)
 
-    reg_path = _find_days_model_path()
-    reg_exists = bool(reg_path and os.path.exists(reg_path))
+    reg_key = registry.resolve("reg", lokasi)
+    reg_entry = registry.entries.get(reg_key) or {}
     return jsonify({
         "features_in_use": feats,
         "is_classifier": hasattr(last, "classes_") or (meta.get("model_kind") == "classifier"),
         "meta": meta,
+        "model_key": registry.resolve("clf", lokasi),
         "use_days_regressor": bool(current_app.config.get("USE_DAYS_REGRESSOR", False)),
-        "days_regressor_exists": reg_exists,
-        "days_regressor_path": reg_path,
+        "days_regressor_key": reg_key,
+        "days_regressor_exists": registry.exists(reg_key),
+        "days_regressor_path": reg_entry.get("path"),
+        "registry": registry.stats(),
     })
 
-def get_days_regressor():
-    if not current_app.config.get("USE_DAYS_REGRESSOR", False):
-        return None, {}
-    if _model_cache["reg"] is None:
-        mdl_path = _find_days_model_path()
-        meta_path = current_app.config.get("METADATA_PATH_DAYS")
-        if not mdl_path:
-            current_app.config["USE_DAYS_REGRESSOR"] = False
-            return None, {}
-        try:
-            pipe = joblib.load(mdl_path)
-        except ModuleNotFoundError as e:
-            if "xgboost" in str(e).lower():
-                raise ModuleNotFoundError(
-                    "Model regressor membutuhkan paket 'xgboost'. "
-                    "Tambahkan ke requirements & install: pip install xgboost"
-                ) from e
-            raise
-        meta = _load_meta(meta_path)
-        _model_cache["reg"] = pipe
-        _model_cache["meta_reg"] = meta
-    return _model_cache["reg"], _model_cache["meta_reg"]
-
 # ---------- LAYAR PREDIKSI LAMA ----------
 @dash_bp.route("/prediksi", methods=["GET", "POST"])
 @login_required
+@admission_required("interactive")
 def prediksi():
     if request.method == "GET":
         today_str = dt.date.today().strftime("%Y-%m-%d")
         return render_template("prediksi.html", today_str=today_str)
 
-    feats = current_app.config["FEATURE_NAMES"]
     f = request.form
 
     lokasi = (f.get("lokasi_tanam") or "").strip() or None
@@ -402,24 +431,28 @@ def prediksi():
     start_str = (f.get("tanggal_input") or "").strip() or None
     start_date = _parse_start_date(start_str)
 
+    clf, meta = get_status_model(lokasi)
+    feats = _model_features(clf, meta)
+
     # nilai-nilai fitur sesuai urutan model
     vals_model = _collect_vals(feats, f)
     X = np.array([[vals_model.get(name, np.nan) for name in feats]], dtype=float)
 
-    clf, meta = get_status_model()
+    t0 = time.perf_counter()
     label = _predict_status(clf, X, meta)
     rekom = _build_rekomendasi(label, vals_model)
 
-    reg, _ = get_days_regressor()
+    reg, reg_meta = get_days_regressor(lokasi)
     if reg is not None:
         try:
-            days = float(reg.predict(X)[0])
+            days = float(reg.predict(_days_matrix(reg, reg_meta, [f]))[0])
             days = max(1.0, min(365.0, round(days)))
         except Exception:
             days = 120.0
     else:
         # fallback ke aturan Excel
         days = float(_rule_waktu_tanam(label))
+    latency = time.perf_counter() - t0
 
     # === hitung tanggal target = start_date + days ===
     target_date = start_date + dt.timedelta(days=int(days))
@@ -438,6 +471,9 @@ def prediksi():
         **vals_db
     )
     db.session.add(rec); db.session.commit()
+    _remember_latest(lokasi, vals_db, label, rekom, days, target_date_iso)
+    observe_prediction(vals_db, label)
+    shadow_submit(vals_model, vals_db, label, days, latency, lokasi)
     flash("Prediksi tersimpan.", "success")
 
     today_str = dt.date.today().strftime("%Y-%m-%d")
@@ -526,7 +562,8 @@ def export_xlsx():
 
 # ==== PDF helpers ============================================================
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import Table, TableStyle, Paragraph
+from reportlab.pdfgen import canvas as pdf_canvas
 from reportlab.lib import colors
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
@@ -542,24 +579,25 @@ def _fmt_cell(v):
         pass
     return str(v)
 
-def _build_pdf_rows(dict_rows):
-    headers = [
-        "Waktu","Lokasi","Suhu Udara","Kelemb. Udara","Suhu Tanah","Kelemb. Tanah",
-        "pH","N","P","K","Curah Hujan","Status","Rekomendasi","Waktu (hari)"
-    ]
-    keys = [
-        "timestamp","lokasi_tanam","suhu_udara","kelembapan_udara","suhu_tanah",
-        "kelembapan_tanah","ph_tanah","nitrogen","fosfor","kalium","curah_hujan",
-        "status_kesuburan","rekomendasi","waktu_tanam_hari"
-    ]
-    cell = ParagraphStyle("cell", fontName="Helvetica", fontSize=8, leading=9.6, spaceBefore=0, spaceAfter=0, wordWrap="CJK")
-    data = [headers]
+_PDF_HEADERS = [
+    "Waktu","Lokasi","Suhu Udara","Kelemb. Udara","Suhu Tanah","Kelemb. Tanah",
+    "pH","N","P","K","Curah Hujan","Status","Rekomendasi","Waktu (hari)"
+]
+_PDF_KEYS = [
+    "timestamp","lokasi_tanam","suhu_udara","kelembapan_udara","suhu_tanah",
+    "kelembapan_tanah","ph_tanah","nitrogen","fosfor","kalium","curah_hujan",
+    "status_kesuburan","rekomendasi","waktu_tanam_hari"
+]
+_PDF_CELL = ParagraphStyle("cell", fontName="Helvetica", fontSize=8, leading=9.6, spaceBefore=0, spaceAfter=0, wordWrap="CJK")
+
+def _build_pdf_rows(dict_rows, header=True):
+    data = [list(_PDF_HEADERS)] if header else []
     for d in dict_rows:
         row = []
-        for k in keys:
+        for k in _PDF_KEYS:
             txt = _fmt_cell(d.get(k))
             if k in ("rekomendasi","lokasi_tanam","status_kesuburan"):
-                row.append(Paragraph(txt, cell))
+                row.append(Paragraph(txt, _PDF_CELL))
             else:
                 row.append(txt)
         data.append(row)
@@ -584,50 +622,7 @@ def _auto_col_widths(data, avail_width):
         widths = [w*scale for w in widths]
     return widths
 
-def _footer(canvas, doc):
-    canvas.saveState()
-    canvas.setFont("Helvetica", 8)
-    canvas.setFillGray(0.4)
-    canvas.drawRightString(doc.pagesize[0]-18, 12, f"Hal. {doc.page}")
-    canvas.restoreState()
-
-@dash_bp.get("/laporan/export.pdf")
-@login_required
-def export_pdf():
-    try:
-        from reportlab.lib.pagesizes import A4, landscape
-    except Exception:
-        flash("Paket reportlab belum terinstal. Tambahkan ke requirements.", "error")
-        return render_template(
-            "laporan.html",
-            rows=PredictionRecord.query.order_by(PredictionRecord.id.desc()).all()
-        )
-
-    q = PredictionRecord.query.order_by(PredictionRecord.id.desc()).all()
-    rows = _records_to_rows(q)
-    data = _build_pdf_rows(rows)
-
-    page_size = landscape(A4)
-    left, right, top, bottom = 18, 18, 22, 18
-    bio = io.BytesIO()
-    doc = SimpleDocTemplate(
-        bio, pagesize=page_size,
-        leftMargin=left, rightMargin=right, topMargin=top, bottomMargin=bottom
-    )
-
-    title = Paragraph(
-        "<b>Laporan Prediksi EUCAGROW</b>",
-        ParagraphStyle("h", alignment=1, fontName="Helvetica-Bold", fontSize=12, leading=14)
-    )
-    sub = Paragraph(
-        f"Digenerasi: {dt.datetime.now():%Y-%m-%d %H:%M:%S} • Total: {len(rows)} baris",
-        ParagraphStyle("s", alignment=1, fontName="Helvetica", fontSize=8, textColor=colors.HexColor('#64748b'))
-    )
-
-    avail_width = page_size[0] - left - right
-    col_widths = _auto_col_widths(data, avail_width)
-
-    tbl = Table(data, colWidths=col_widths, repeatRows=1)
+def _pdf_table_style():
     style = TableStyle([
         ("FONT", (0,0), (-1,-1), "Helvetica", 8),
         ("LEADING", (0,0), (-1,-1), 9.6),
@@ -645,14 +640,149 @@ def export_pdf():
     ])
     for c in _NUM_COLS:
         style.add("ALIGN", (c,1), (c,-1), "RIGHT")
-    tbl.setStyle(style)
+    return style
 
-    elements = [title, sub, Spacer(0, 8), tbl]
-    doc.build(elements, onFirstPage=_footer, onLaterPages=_footer)
+def _iter_export_chunks(chunk_size: int):
+    """
+    Stream baris laporan dari DB per chunk: hanya kolom export (Row, bukan
+    objek ORM) sehingga identity map session tidak ikut membengkak.
+    """
+    t = PredictionRecord.__table__.c
+    stmt = db.select(*[t[attr] for _, attr in _EXPORT_COLS]).order_by(t.id.desc())
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for part in result.partitions():
+        yield _records_to_rows(part)
 
-    bio.seek(0)
+def render_pdf_report(out, row_chunks, total: int, rows_per_page: int = 40):
+    """
+    Render laporan PDF langsung ke canvas, satu segmen tabel per halaman
+    (maks. rows_per_page baris). Hanya satu chunk baris + satu segmen yang
+    hidup di memori; lebar kolom dihitung sekali dari chunk pertama lalu
+    dipakai ulang. Baris yang tidak muat di halaman dikembalikan ke antrean
+    dan jadi awal segmen berikutnya.
+    """
+    page_size = landscape(A4)
+    left, right, top, bottom = 18, 18, 22, 18
+    avail_w = page_size[0] - left - right
+    top_y = page_size[1] - top
+
+    c = pdf_canvas.Canvas(out, pagesize=page_size)
+    c.setTitle("Laporan Prediksi EUCAGROW")
+    state = {"page": 1, "y": top_y, "blank": True}
+
+    def new_page():
+        _draw_footer(c, page_size, state["page"])
+        c.showPage()
+        state.update(page=state["page"] + 1, y=top_y, blank=True)
+
+    def draw_flowable(fl, gap=0):
+        _, h = fl.wrapOn(c, avail_w, state["y"] - bottom)
+        fl.drawOn(c, left, state["y"] - h)
+        state["y"] -= h + gap
+
+    title = Paragraph(
+        "<b>Laporan Prediksi EUCAGROW</b>",
+        ParagraphStyle("h", alignment=1, fontName="Helvetica-Bold", fontSize=12, leading=14)
+    )
+    sub = Paragraph(
+        f"Digenerasi: {dt.datetime.now():%Y-%m-%d %H:%M:%S} • Total: {total} baris",
+        ParagraphStyle("s", alignment=1, fontName="Helvetica", fontSize=8, textColor=colors.HexColor('#64748b'))
+    )
+    draw_flowable(title)
+    draw_flowable(sub, gap=8)
+
+    style = _pdf_table_style()
+    widths = None
+
+    def make_table(rows):
+        tbl = Table([list(_PDF_HEADERS)] + rows, colWidths=widths, repeatRows=1)
+        tbl.setStyle(style)
+        return tbl
+
+    def fit_rows(rows, avail_h) -> tuple:
+        """(n, tabel, tinggi) untuk baris terbanyak yang muat; bisection atas tinggi wrapOn."""
+        best = None
+        lo, hi = 1, len(rows) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            tbl = make_table(rows[:mid])
+            _, h = tbl.wrapOn(c, avail_w, avail_h)
+            if h <= avail_h:
+                best, lo = (mid, tbl, h), mid + 1
+            else:
+                hi = mid - 1
+        if best is None:
+            # satu baris pun tidak muat: tetap gambar satu baris agar tidak macet
+            tbl = make_table(rows[:1])
+            best = (1, tbl, tbl.wrapOn(c, avail_w, avail_h)[1])
+        return best
+
+    def draw_segment(rows) -> int:
+        """Gambar satu segmen di halaman baru; return jumlah baris yang terpakai."""
+        if not state["blank"]:
+            new_page()
+        # ruang dihitung ulang tiap halaman (judul di halaman 1, baris yang wrap)
+        avail_h = state["y"] - bottom
+        tbl = make_table(rows)
+        _, h = tbl.wrapOn(c, avail_w, avail_h)
+        n = len(rows)
+        if h > avail_h and n > 1:
+            n, tbl, h = fit_rows(rows, avail_h)
+        tbl.drawOn(c, left, state["y"] - h)
+        state["y"] -= h
+        state["blank"] = False
+        return n
+
+    pending = []
+    for chunk in row_chunks:
+        rows = _build_pdf_rows(chunk, header=False)
+        if widths is None:
+            widths = _auto_col_widths([list(_PDF_HEADERS)] + rows, avail_w)
+        pending.extend(rows)
+        while len(pending) >= rows_per_page:
+            del pending[:draw_segment(pending[:rows_per_page])]
+
+    if widths is None:
+        widths = _auto_col_widths([list(_PDF_HEADERS)], avail_w)
+    if not pending and state["blank"]:
+        draw_segment([])  # laporan kosong: tetap tampilkan header tabel
+    while pending:
+        del pending[:draw_segment(pending[:rows_per_page])]
+
+    _draw_footer(c, page_size, state["page"])
+    c.save()
+    return state["page"]
+
+def _draw_footer(canvas, page_size, page_no):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 8)
+    canvas.setFillGray(0.4)
+    canvas.drawRightString(page_size[0]-18, 12, f"Hal. {page_no}")
+    canvas.restoreState()
+
+@dash_bp.get("/laporan/export.pdf")
+@login_required
+def export_pdf():
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+    except Exception:
+        flash("Paket reportlab belum terinstal. Tambahkan ke requirements.", "error")
+        return render_template(
+            "laporan.html",
+            rows=PredictionRecord.query.order_by(PredictionRecord.id.desc()).all()
+        )
+
+    total = db.session.scalar(db.select(db.func.count()).select_from(PredictionRecord))
+    chunks = _iter_export_chunks(int(current_app.config.get("PDF_FETCH_SIZE", 2000)))
+
+    # tulis ke file sementara, bukan BytesIO, supaya PDF besar tidak menumpuk di RSS worker
+    out = tempfile.TemporaryFile()
+    render_pdf_report(out, chunks, total,
+                      rows_per_page=int(current_app.config.get("PDF_ROWS_PER_PAGE", 40)))
+
+    out.seek(0)
     return send_file(
-        bio, as_attachment=True,
+        out, as_attachment=True,
         download_name="laporan_eucagrow.pdf",
         mimetype="application/pdf"
     )
@@ -0,0 +1,358 @@
+# myapp/diagnostics.py
+"""
+Diagnostik memori per worker (khusus admin, lihat ADMIN_USERNAMES).
+
+    GET  /api/diag/memory                  RSS, footprint model, jumlah objek Python per tipe
+    GET  /api/diag/workers                 ringkasan RSS semua worker (dari instance/diag/)
+    POST /api/diag/gc[?trim=1]             gc.collect (+ malloc_trim glibc), RSS sebelum/sesudah
+    POST /api/diag/tracemalloc/start       mulai tracing (body JSON opsional: {"frames": 10})
+    POST /api/diag/tracemalloc/snapshot    ambil snapshot + top lokasi alokasi
+    GET  /api/diag/tracemalloc/diff        bandingkan dua snapshot (?a=&b=&key=lineno|filename|traceback)
+    POST /api/diag/tracemalloc/stop        hentikan tracing & buang snapshot
+
+Semua angka berlaku untuk proses yang kebetulan melayani request (lihat
+"pid" di response). Tiap worker menulis ringkasan kecil ke instance/diag/
+paling sering tiap DIAG_CHECK_SECONDS, jadi /api/diag/workers bisa
+menampilkan semua worker sekaligus. Untuk men-trace semua worker sejak
+start, jalankan gunicorn dengan PYTHONTRACEMALLOC=<frames>.
+
+Bila WORKER_MAX_RSS_MB > 0, worker gunicorn yang RSS-nya melewati batas
+mengirim SIGTERM ke dirinya sendiri: request yang sedang jalan diselesaikan,
+lalu master gunicorn menggantinya dengan worker baru.
+"""
+import datetime as dt
+import gc
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+from flask import Blueprint, current_app, jsonify, request
+
+from .auth import admin_required
+from .registry import get_model_registry
+
+diag_bp = Blueprint("diag", __name__)
+
+# tipe yang dicurigai menahan memori: buffer export, hasil .all(), model
+_WATCH_TYPES = ("BytesIO", "StringIO", "DataFrame", "Workbook", "PredictionRecord", "User", "Booster")
+
+_STARTED_AT = dt.datetime.utcnow().isoformat(timespec="seconds")
+
+
+# ---------- ukuran proses ----------
+def _rss_bytes() -> int | None:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux: KiB
+
+
+def _mib(n: int | None) -> float | None:
+    return round(n / 2**20, 1) if n is not None else None
+
+
+def _object_counts(top: int) -> dict:
+    counts = Counter()
+    short = Counter()
+    for o in gc.get_objects():
+        t = type(o)
+        counts[f"{t.__module__}.{t.__qualname__}"] += 1
+        short[t.__name__] += 1
+    return {
+        "tracked_total": sum(counts.values()),
+        "watched": {name: short.get(name, 0) for name in _WATCH_TYPES},
+        "top": [{"type": k, "count": v} for k, v in counts.most_common(top)],
+        "gc_generations": gc.get_count(),
+        "gc_garbage": len(gc.garbage),
+    }
+
+
+# ---------- tracemalloc ----------
+_snapshots = OrderedDict()  # id -> (waktu ambil, Snapshot)
+_snap_lock = threading.Lock()
+_snap_seq = 0
+
+_KEY_TYPES = ("lineno", "filename", "traceback")
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _stat_row(st) -> dict:
+    frame = st.traceback[-1]  # frame terbaru = lokasi alokasi
+    row = {"site": f"{frame.filename}:{frame.lineno}", "size_bytes": st.size, "count": st.count}
+    if len(st.traceback) > 1:
+        row["traceback"] = [f"{f.filename}:{f.lineno}" for f in st.traceback]
+    if hasattr(st, "size_diff"):
+        row["size_diff_bytes"] = st.size_diff
+        row["count_diff"] = st.count_diff
+    return row
+
+
+def _traced() -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_mib": _mib(current),
+        "traced_peak_mib": _mib(peak),
+        "overhead_mib": _mib(tracemalloc.get_tracemalloc_memory()),
+        "snapshots": list(_snapshots),
+    }
+
+
+def _limit_arg(default: int) -> int:
+    try:
+        return max(1, min(500, int(request.args.get("limit", default))))
+    except ValueError:
+        return default
+
+
+# ---------- ringkasan per worker & recycle ----------
+_next_check = 0.0
+_recycling = False
+_requests = 0
+
+
+def _worker_summary(rss: int | None) -> dict:
+    return {
+        "pid": os.getpid(),
+        "ppid": os.getppid(),
+        "rss_mib": _mib(rss),
+        "peak_rss_mib": _mib(_peak_rss_bytes()),
+        "models_cached_mib": _mib(get_model_registry().stats()["cached_bytes"]),
+        "tracemalloc": tracemalloc.is_tracing(),
+        "requests": _requests,
+        "over_rss_limit": _recycling,
+        "started_at": _STARTED_AT,
+        "updated_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+        "updated_ts": time.time(),
+    }
+
+
+def _diag_dir() -> str:
+    return os.path.join(current_app.instance_path, "diag")
+
+
+def _publish(rss: int | None) -> None:
+    path = os.path.join(_diag_dir(), f"worker-{os.getpid()}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_worker_summary(rss), f)
+    os.replace(tmp, path)
+
+
+def _maybe_recycle(rss: int | None) -> None:
+    global _recycling
+    limit_mb = current_app.config.get("WORKER_MAX_RSS_MB", 0)
+    if not limit_mb or rss is None or _recycling or rss < limit_mb * 2**20:
+        return
+    _recycling = True
+    if not request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn"):
+        current_app.logger.warning(
+            "RSS %.0f MiB melewati WORKER_MAX_RSS_MB=%s, tapi recycle hanya jalan di bawah gunicorn",
+            rss / 2**20, limit_mb)
+        return
+    current_app.logger.warning(
+        "worker %d: RSS %.0f MiB melewati WORKER_MAX_RSS_MB=%s, worker di-recycle",
+        os.getpid(), rss / 2**20, limit_mb)
+    # SIGTERM ke worker = graceful shutdown; master gunicorn men-spawn pengganti
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+@diag_bp.after_app_request
+def _watch_memory(resp):
+    global _next_check, _requests
+    _requests += 1
+    now = time.monotonic()
+    if now < _next_check:
+        return resp
+    _next_check = now + float(current_app.config.get("DIAG_CHECK_SECONDS", 30))
+    try:
+        rss = _rss_bytes()
+        _publish(rss)
+        _maybe_recycle(rss)
+    except Exception:
+        current_app.logger.exception("diag: cek memori worker gagal")
+    return resp
+
+
+# =================== ROUTES ===================
+
+@diag_bp.get("/api/diag/memory")
+@admin_required
+def api_memory():
+    top = _limit_arg(int(current_app.config.get("DIAG_TOP_N", 25)))
+    deep = request.args.get("deep") in ("1", "true")
+    registry = get_model_registry()
+    reg_stats = registry.stats()
+    rss = _rss_bytes()
+    out = {
+        "ok": True,
+        **_worker_summary(rss),
+        "max_rss_mib": current_app.config.get("WORKER_MAX_RSS_MB", 0) or None,
+        "models": {
+            "cached_mib": _mib(reg_stats["cached_bytes"]),
+            "pinned_mib": _mib(reg_stats["pinned_bytes"]),
+            "items": registry.footprint(deep=deep),
+        },
+        "tracemalloc": _traced(),
+    }
+    if request.args.get("objects", "1") not in ("0", "false"):
+        t0 = time.perf_counter()
+        out["objects"] = _object_counts(top)
+        out["objects"]["scan_ms"] = round(1000 * (time.perf_counter() - t0), 1)
+    return jsonify(out)
+
+
+@diag_bp.get("/api/diag/workers")
+@admin_required
+def api_workers():
+    _publish(_rss_bytes())
+    stale_after = max(60.0, 3 * float(current_app.config.get("DIAG_CHECK_SECONDS", 30)))
+    now = time.time()
+    workers = []
+    d = _diag_dir()
+    for name in sorted(os.listdir(d)):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(d, name), "r", encoding="utf-8") as f:
+                w = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # worker yang sudah mati tidak menghapus file-nya; tandai dari umur data
+        age = now - w.get("updated_ts", 0)
+        if age > 20 * stale_after:
+            try:
+                os.remove(os.path.join(d, name))
+            except OSError:
+                pass
+            continue
+        w["stale"] = age > stale_after
+        workers.append(w)
+    workers.sort(key=lambda w: (w["stale"], -(w.get("rss_mib") or 0)))
+    return jsonify(ok=True, pid=os.getpid(), workers=workers)
+
+
+@diag_bp.post("/api/diag/gc")
+@admin_required
+def api_gc():
+    before = _rss_bytes()
+    t0 = time.perf_counter()
+    collected = gc.collect()
+    trimmed = None
+    if request.args.get("trim") in ("1", "true"):
+        # kembalikan heap bebas glibc ke OS (fragmentasi buffer export dll.)
+        try:
+            import ctypes
+            trimmed = bool(ctypes.CDLL("libc.so.6").malloc_trim(0))
+        except (OSError, AttributeError):
+            trimmed = None
+    after = _rss_bytes()
+    return jsonify(
+        ok=True, pid=os.getpid(), collected=collected, malloc_trim=trimmed,
+        rss_before_mib=_mib(before), rss_after_mib=_mib(after),
+        elapsed_ms=round(1000 * (time.perf_counter() - t0), 1),
+    )
+
+
+@diag_bp.post("/api/diag/tracemalloc/start")
+@admin_required
+def api_tracemalloc_start():
+    data = request.get_json(silent=True) or {}
+    try:
+        frames = int(data.get("frames") or current_app.config.get("DIAG_TRACEMALLOC_FRAMES", 10))
+    except (TypeError, ValueError):
+        return jsonify(ok=False, error="frames harus bilangan bulat"), 400
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+    return jsonify(ok=True, pid=os.getpid(), **_traced())
+
+
+@diag_bp.post("/api/diag/tracemalloc/snapshot")
+@admin_required
+def api_tracemalloc_snapshot():
+    global _snap_seq
+    if not tracemalloc.is_tracing():
+        return jsonify(ok=False, pid=os.getpid(),
+                       error="tracemalloc belum aktif di worker ini; POST /api/diag/tracemalloc/start "
+                             "atau jalankan dengan PYTHONTRACEMALLOC=<frames>"), 409
+    snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    keep = max(2, int(current_app.config.get("DIAG_MAX_SNAPSHOTS", 4)))
+    with _snap_lock:
+        _snap_seq += 1
+        snap_id = _snap_seq
+        _snapshots[snap_id] = (dt.datetime.utcnow().isoformat(timespec="seconds"), snap)
+        while len(_snapshots) > keep:
+            _snapshots.popitem(last=False)
+
+    limit = _limit_arg(int(current_app.config.get("DIAG_TOP_N", 25)))
+    stats = snap.statistics("lineno")
+    return jsonify(
+        ok=True, pid=os.getpid(), id=snap_id, **{k: v for k, v in _traced().items() if k != "tracing"},
+        top=[_stat_row(st) for st in stats[:limit]],
+    )
+
+
+@diag_bp.get("/api/diag/tracemalloc/diff")
+@admin_required
+def api_tracemalloc_diff():
+    key_type = request.args.get("key", "lineno")
+    if key_type not in _KEY_TYPES:
+        return jsonify(ok=False, error=f"key harus salah satu dari {_KEY_TYPES}"), 400
+    with _snap_lock:
+        ids = list(_snapshots)
+        try:
+            a = int(request.args.get("a") or (ids[-2] if len(ids) >= 2 else 0))
+            b = int(request.args.get("b") or (ids[-1] if ids else 0))
+        except ValueError:
+            return jsonify(ok=False, error="a/b harus id snapshot"), 400
+        if a not in _snapshots or b not in _snapshots:
+            return jsonify(ok=False, pid=os.getpid(), snapshots=ids,
+                           error="snapshot tidak ditemukan di worker ini (butuh minimal dua)"), 404
+        (at_a, snap_a), (at_b, snap_b) = _snapshots[a], _snapshots[b]
+
+    limit = _limit_arg(int(current_app.config.get("DIAG_TOP_N", 25)))
+    stats = snap_b.compare_to(snap_a, key_type)
+    return jsonify(
+        ok=True, pid=os.getpid(), key=key_type,
+        a={"id": a, "taken_at": at_a}, b={"id": b, "taken_at": at_b},
+        size_diff_mib=_mib(sum(st.size_diff for st in stats)),
+        top=[_stat_row(st) for st in stats[:limit]],
+    )
+
+
+@diag_bp.post("/api/diag/tracemalloc/stop")
+@admin_required
+def api_tracemalloc_stop():
+    with _snap_lock:
+        _snapshots.clear()
+    tracemalloc.stop()
+    return jsonify(ok=True, pid=os.getpid(), tracing=False)
@@ -0,0 +1,277 @@
+# myapp/drift.py
+"""
+Monitoring drift fitur & distribusi prediksi.
+
+Histogram streaming per fitur (bin mengikuti cut-point kuantil dari data
+training) dan hitungan per kelas status_kesuburan di-update O(1) per
+prediksi. Laporan PSI / KS (versi ter-bin) dibandingkan dengan distribusi
+referensi di models/status_reference.json.
+
+Histogram disimpan per proses lalu ditulis ke instance/drift/ paling sering
+tiap DRIFT_PUBLISH_SECONDS (lihat workerstats.py); /api/drift menjumlahkan
+hitungan semua worker, jadi DRIFT_MIN_SAMPLES berlaku untuk total trafik.
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+import click
+from flask import Blueprint, current_app, jsonify
+from flask_login import login_required
+
+from . import workerstats
+from .auth import admin_required
+from .models import SENSOR_COLS
+
+drift_bp = Blueprint("drift", __name__)
+
+_EPS = 1e-4
+
+
+def _proportions(counts: list) -> list:
+    total = sum(counts)
+    if total <= 0:
+        return [0.0] * len(counts)
+    return [c / total for c in counts]
+
+
+def psi(ref: list, cur: list) -> float:
+    """Population Stability Index antara dua vektor proporsi."""
+    out = 0.0
+    for p, q in zip(ref, cur):
+        p, q = max(p, _EPS), max(q, _EPS)
+        out += (q - p) * math.log(q / p)
+    return out
+
+
+def ks_binned(ref: list, cur: list) -> float:
+    """Statistik KS dari CDF ter-bin (maks. selisih kumulatif)."""
+    cr = cc = d = 0.0
+    for p, q in zip(ref, cur):
+        cr += p
+        cc += q
+        d = max(d, abs(cr - cc))
+    return d
+
+
+class DriftMonitor:
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self._lock = threading.Lock()
+        self._cuts = {k: list(v["cuts"]) for k, v in reference.get("features", {}).items()}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {k: [0] * (len(c) + 1) for k, c in self._cuts.items()}
+            self._missing = {k: 0 for k in self._cuts}
+            self._classes = {}
+            self._n = 0
+            self._since = time.time()
+
+    def observe(self, features: dict, label: str | None) -> None:
+        """Catat satu prediksi. features: {kolom_db: nilai}. Biaya: satu bisect per fitur."""
+        with self._lock:
+            self._n += 1
+            for k, cuts in self._cuts.items():
+                v = features.get(k)
+                if v is None or v != v:  # None / NaN
+                    self._missing[k] += 1
+                else:
+                    self._counts[k][bisect_right(cuts, v)] += 1
+            if label is not None:
+                self._classes[label] = self._classes.get(label, 0) + 1
+
+    def export(self) -> dict:
+        """Hitungan mentah worker ini (JSON) untuk digabung lintas worker."""
+        with self._lock:
+            return {
+                "built_at": self.reference.get("built_at"),
+                "since": self._since,
+                "n": self._n,
+                "counts": {k: list(v) for k, v in self._counts.items()},
+                "missing": dict(self._missing),
+                "classes": dict(self._classes),
+            }
+
+    def merge(self, states: list) -> dict:
+        """Jumlahkan export() beberapa worker; state dari referensi lain dilewati."""
+        out = {
+            "since": None, "n": 0,
+            "counts": {k: [0] * (len(c) + 1) for k, c in self._cuts.items()},
+            "missing": {k: 0 for k in self._cuts},
+            "classes": {},
+        }
+        for st in states:
+            if st.get("built_at") != self.reference.get("built_at"):
+                continue
+            out["n"] += st["n"]
+            out["since"] = st["since"] if out["since"] is None else min(out["since"], st["since"])
+            for k, cur in out["counts"].items():
+                add = st["counts"].get(k) or []
+                if len(add) == len(cur):
+                    out["counts"][k] = [a + b for a, b in zip(cur, add)]
+                out["missing"][k] += st["missing"].get(k, 0)
+            for c, v in st["classes"].items():
+                out["classes"][c] = out["classes"].get(c, 0) + v
+        return out
+
+    def report(self, psi_threshold: float = 0.2, min_samples: int = 100, state: dict | None = None) -> dict:
+        """state: hasil export()/merge(); default hitungan worker ini."""
+        state = state or self.export()
+        counts, missing, classes = state["counts"], state["missing"], state["classes"]
+        n, since = state["n"], state["since"]
+
+        enough = n >= min_samples
+        feats = {}
+        for k, cur_counts in counts.items():
+            ref_p = _proportions(self.reference["features"][k]["counts"])
+            cur_p = _proportions(cur_counts)
+            observed = sum(cur_counts)
+            score = psi(ref_p, cur_p) if observed else None
+            feats[k] = {
+                "n": observed,
+                "missing": missing[k],
+                "psi": None if score is None else round(score, 4),
+                "ks": round(ks_binned(ref_p, cur_p), 4) if observed else None,
+                "drift": bool(enough and score is not None and score >= psi_threshold),
+            }
+
+        ref_cls = self.reference.get("classes", {})
+        labels = sorted(set(ref_cls) | set(classes))
+        ref_p = _proportions([ref_cls.get(c, 0) for c in labels])
+        cur_p = _proportions([classes.get(c, 0) for c in labels])
+        cls_psi = psi(ref_p, cur_p) if classes else None
+        cls_report = {
+            "counts": classes,
+            "proportions": {c: round(p, 4) for c, p in zip(labels, cur_p)},
+            "reference": {c: round(p, 4) for c, p in zip(labels, ref_p)},
+            "psi": None if cls_psi is None else round(cls_psi, 4),
+            "drift": bool(enough and cls_psi is not None and cls_psi >= psi_threshold),
+        }
+
+        drifted = [k for k, v in feats.items() if v["drift"]]
+        if cls_report["drift"]:
+            drifted.append("status_kesuburan")
+        return {
+            "n": n,
+            "since": since,
+            "min_samples": min_samples,
+            "psi_threshold": psi_threshold,
+            "enough_samples": enough,
+            "drift": bool(drifted),
+            "drifted": drifted,
+            "features": feats,
+            "status_kesuburan": cls_report,
+        }
+
+
+# ---------- instance per proses ----------
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_drift_monitor() -> DriftMonitor | None:
+    """Muat referensi sekali per proses; None kalau file referensi tidak ada."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                path = current_app.config.get("DRIFT_REFERENCE_PATH", "models/status_reference.json")
+                if not path or not os.path.exists(path):
+                    return None
+                with open(path, "r", encoding="utf-8") as f:
+                    _monitor = DriftMonitor(json.load(f))
+    return _monitor
+
+
+def _sync(mon: DriftMonitor, force: bool = False) -> None:
+    interval = float(current_app.config.get("DRIFT_PUBLISH_SECONDS", 10))
+    workerstats.sync("drift", mon.export, mon.reset, interval, force=force)
+
+
+def observe_prediction(vals_db: dict, label: str | None) -> None:
+    """Hook murah untuk route prediksi; tidak pernah menggagalkan request."""
+    try:
+        mon = get_drift_monitor()
+        if mon is not None:
+            mon.observe(vals_db, label)
+            _sync(mon)
+    except Exception:
+        current_app.logger.exception("drift observe gagal")
+
+
+# =================== ROUTES ===================
+
+@drift_bp.get("/api/drift")
+@login_required
+def api_drift():
+    mon = get_drift_monitor()
+    if mon is None:
+        return jsonify(ok=False, error="File referensi drift tidak ditemukan. Jalankan: flask drift build-reference"), 404
+    _sync(mon, force=True)
+    states = workerstats.collect("drift")
+    rep = mon.report(
+        psi_threshold=float(current_app.config.get("DRIFT_PSI_THRESHOLD", 0.2)),
+        min_samples=int(current_app.config.get("DRIFT_MIN_SAMPLES", 100)),
+        state=mon.merge(states),
+    )
+    return jsonify(ok=True, workers=len(states), **rep)
+
+
+@drift_bp.post("/api/drift/reset")
+@admin_required
+def api_drift_reset():
+    """Reset hitungan semua worker (masing-masing saat sync berikutnya)."""
+    mon = get_drift_monitor()
+    if mon is not None:
+        workerstats.request_reset("drift")
+        _sync(mon, force=True)
+    return jsonify(ok=True)
+
+
+# =================== CLI ===================
+
+@drift_bp.cli.command("build-reference")
+@click.option("--source", default="notebooks/data/eucalyptus.xlsx", show_default=True,
+              help="Data training (.xlsx / .csv).")
+@click.option("--bins", default=10, show_default=True, help="Jumlah bin kuantil per fitur.")
+@click.option("--out", default=None, help="Default: DRIFT_REFERENCE_PATH.")
+def build_reference(source, bins, out):
+    """Bangun distribusi referensi dari data training."""
+    import numpy as np
+    import pandas as pd
+    from .dashboard import _to_db_key
+
+    df = pd.read_excel(source) if source.lower().endswith((".xlsx", ".xls")) else pd.read_csv(source)
+    # samakan dengan normalize_col di notebook training, lalu ke nama kolom DB
+    cols = {}
+    for c in df.columns:
+        n = str(c).strip().lower()
+        for ch in [" ", "-", ".", ",", "/", "(", ")", "[", "]"]:
+            n = n.replace(ch, "_")
+        while "__" in n:
+            n = n.replace("__", "_")
+        cols[c] = _to_db_key(n.strip("_"))
+    df = df.rename(columns=cols)
+
+    ref = {"source": source, "n": int(len(df)), "built_at": int(time.time()), "features": {}, "classes": {}}
+    for key in SENSOR_COLS:
+        if key not in df.columns:
+            click.echo(f"lewati {key}: kolom tidak ada di {source}")
+            continue
+        vals = pd.to_numeric(df[key], errors="coerce").dropna().to_numpy(dtype=float)
+        cuts = np.unique(np.quantile(vals, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(cuts, vals, side="right"), minlength=len(cuts) + 1)
+        ref["features"][key] = {"cuts": [float(x) for x in cuts], "counts": [int(x) for x in counts]}
+
+    if "status_kesuburan" in df.columns:
+        ref["classes"] = {str(k): int(v) for k, v in df["status_kesuburan"].value_counts().items()}
+
+    out = out or current_app.config.get("DRIFT_REFERENCE_PATH", "models/status_reference.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(ref, f, indent=2, ensure_ascii=False)
+    click.echo(f"Referensi drift ditulis ke {out} ({len(ref['features'])} fitur, {ref['n']} baris)")
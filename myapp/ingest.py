@@ -0,0 +1,337 @@
+# myapp/ingest.py
+"""
+Ingest streaming NDJSON untuk gateway sensor.
+
+Satu koneksi POST /api/ingest membawa banyak baris JSON (satu objek per
+baris, format sama dengan body /api/predict). Baris dikumpulkan menjadi
+micro-batch (ukuran atau umur maksimum), diskor sekaligus, lalu disimpan
+dengan satu bulk insert. Setiap batch dibalas satu baris NDJSON (ack).
+
+Backpressure: thread pembaca menaruh baris ke antrean berukuran tetap.
+Kalau scoring tertinggal, antrean penuh, pembaca berhenti membaca socket,
+dan TCP flow control menahan gateway.
+
+Tiap stream memegang satu thread worker selama koneksinya terbuka, jadi
+jumlah stream per proses dibatasi INGEST_MAX_STREAMS; stream berikutnya
+langsung dijawab 503 + Retry-After supaya thread tersisa tetap melayani
+dashboard.
+"""
+import json
+import queue
+import threading
+import time
+import datetime as dt
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+
+from .extensions import db
+from .models import PredictionRecord, SENSOR_COLS
+from .latest import latest_readings
+from .drift import observe_prediction
+from .admission import admission_required, inference_slot, shed_response
+from .registry import get_model_registry, UnknownModel
+from .dashboard import _score_batch, _vals_for_db, _parse_start_date, _build_rekomendasi
+
+ingest_bp = Blueprint("ingest", __name__)
+
+_EOF = object()
+
+# stream ingest yang sedang terbuka di proses ini
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _open_stream(limit: int) -> bool:
+    global _streams
+    with _streams_lock:
+        if _streams >= limit:
+            return False
+        _streams += 1
+        return True
+
+
+def _close_stream() -> None:
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """put() yang bisa dibatalkan; blok selama antrean penuh (backpressure)."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _reader(stream, q: queue.Queue, stop: threading.Event, max_line: int) -> None:
+    """
+    Baca body request baris per baris dan teruskan ke antrean sebagai
+    (waktu_terima_utc, baris): waktu dicatat saat baris dibaca, bukan saat
+    batch-nya diskor, supaya tiap baris punya created_at sendiri.
+    """
+    try:
+        while not stop.is_set():
+            line = stream.readline(max_line + 1)
+            if not line:
+                break
+            received_at = dt.datetime.utcnow()
+            if len(line) > max_line and not line.endswith(b"\n"):
+                # buang sisa baris yang kepanjangan
+                while True:
+                    rest = stream.readline(max_line)
+                    if not rest or rest.endswith(b"\n"):
+                        break
+                line = ValueError(f"baris melebihi {max_line} byte")
+            if not _put(q, (received_at, line), stop):
+                return
+    except Exception as e:
+        _put(q, e, stop)
+    finally:
+        _put(q, _EOF, stop)
+
+
+_TEXT_FIELDS = ("lokasi_tanam", "tanggal_input", "model", "model_days")
+_LOKASI_MAX = PredictionRecord.__table__.c.lokasi_tanam.type.length
+
+
+def _reject_constant(name: str):
+    raise ValueError(f"nilai {name} tidak didukung")
+
+
+def _parse_line(raw: bytes) -> tuple:
+    """
+    Parse & validasi satu baris NDJSON (butuh app context untuk registry).
+    ValueError = hanya baris ini yang ditolak; baris yang lolos dijamin tidak
+    menggagalkan micro-batch-nya. Return (data, opsi) dengan opsi sudah dinormalisasi.
+    """
+    data = json.loads(raw, parse_constant=_reject_constant)
+    if not isinstance(data, dict):
+        raise ValueError("baris harus berupa objek JSON")
+    for k in _TEXT_FIELDS:
+        v = data.get(k)
+        if v is not None and not isinstance(v, str):
+            raise ValueError(f"'{k}' harus berupa string")
+    lokasi = (data.get("lokasi_tanam") or "").strip() or None
+    if lokasi and len(lokasi) > _LOKASI_MAX:
+        raise ValueError(f"'lokasi_tanam' melebihi {_LOKASI_MAX} karakter")
+    opts = {
+        "lokasi": lokasi,
+        "model": (data.get("model") or "").strip() or None,
+        "model_days": (data.get("model_days") or "").strip() or None,
+        "start_date": _parse_start_date((data.get("tanggal_input") or "").strip() or None),
+    }
+    # key model eksplisit dicek di sini, seperti 400 di /api/predict
+    registry = get_model_registry()
+    try:
+        registry.resolve("clf", lokasi, opts["model"])
+        registry.resolve("reg", lokasi, opts["model_days"])
+    except UnknownModel as e:
+        raise ValueError(f"Model tidak dikenal: {e.args[0]}") from None
+    return data, opts
+
+
+def _score_and_store(items: list) -> dict:
+    """
+    Skor satu micro-batch (satu predict per model yang terlibat) lalu simpan
+    dengan bulk insert. items: list[(nomor_baris, dict_json, opsi)] hasil
+    _parse_line, opsi["received_at"] = waktu baris diterima (jadi created_at).
+    """
+    scored = _score_batch([
+        (opts["lokasi"], opts["model"], opts["model_days"], data)
+        for _, data, opts in items
+    ])
+
+    rows, latest = [], []
+    for (_, _, opts), (vals_model, label, d) in zip(items, scored):
+        lokasi = opts["lokasi"]
+        at = opts["received_at"]
+        start_date = opts["start_date"]
+        vals_db = _vals_for_db(vals_model)
+        result = {
+            "status_kesuburan": label,
+            "rekomendasi": _build_rekomendasi(label, vals_model),
+            "waktu_tanam_hari": int(d),
+            "waktu_tanam_tanggal": (start_date + dt.timedelta(days=int(d))).isoformat(),
+        }
+        rows.append(dict(user_id=current_user.id, created_at=at, lokasi_tanam=lokasi, **result, **vals_db))
+        latest.append((lokasi, vals_db, result, at))
+
+    db.session.execute(db.insert(PredictionRecord), rows)
+    db.session.commit()
+
+    # urutan dijaga: baris terakhir per lokasi dalam batch yang tersimpan di cache
+    for lokasi, vals_db, result, at in latest:
+        latest_readings.update(lokasi, vals_db, result, at=at)
+        observe_prediction(vals_db, result["status_kesuburan"])
+    return {"accepted": len(rows)}
+
+
+@ingest_bp.post("/api/ingest")
+@login_required
+@admission_required("machine")  # tolak koneksi baru dengan cepat saat overload
+def api_ingest():
+    cfg = current_app.config
+    batch_size = max(1, int(cfg.get("INGEST_BATCH_SIZE", 256)))
+    flush_secs = max(0.01, float(cfg.get("INGEST_FLUSH_SECONDS", 1.0)))
+    max_line = int(cfg.get("INGEST_MAX_LINE_BYTES", 16384))
+    if not _open_stream(max(1, int(cfg.get("INGEST_MAX_STREAMS", 2)))):
+        return shed_response("machine", "streams_full")
+
+    q = queue.Queue(maxsize=max(1, int(cfg.get("INGEST_QUEUE_SIZE", 2048))))
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_reader, args=(request.stream, q, stop, max_line),
+        name="ingest-reader", daemon=True,
+    )
+
+    def generate():
+        reader.start()
+        batch, errors = [], []
+        lineno = n_batch = total_ok = total_err = 0
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = q.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                done = item is _EOF
+                if isinstance(item, tuple):
+                    received_at, item = item
+                    lineno += 1
+                    if isinstance(item, ValueError):
+                        errors.append({"line": lineno, "error": str(item)})
+                    elif item.strip():
+                        try:
+                            data, opts = _parse_line(item)
+                            opts["received_at"] = received_at
+                            batch.append((lineno, data, opts))
+                            if deadline is None:
+                                deadline = time.monotonic() + flush_secs
+                        except ValueError as e:
+                            errors.append({"line": lineno, "error": str(e)})
+                elif isinstance(item, Exception):
+                    errors.append({"line": lineno, "error": f"stream terputus: {item}"})
+                    done = True
+
+                due = deadline is not None and time.monotonic() >= deadline
+                if batch and (done or due or len(batch) >= batch_size):
+                    n_batch += 1
+                    ack = {"batch": n_batch, "first_line": batch[0][0], "last_line": batch[-1][0]}
+                    try:
+                        # tunggu slot (bukan dibuang): scoring yang tertahan = backpressure ke gateway
+                        with inference_slot("machine", block=True):
+                            ack.update(_score_and_store(batch))
+                        total_ok += ack["accepted"]
+                    except Exception as e:
+                        db.session.rollback()
+                        current_app.logger.exception("ingest batch %s gagal", n_batch)
+                        ack.update(accepted=0, failed=len(batch), error=str(e))
+                        total_err += len(batch)
+                    if errors:
+                        ack["rejected"] = errors
+                        total_err += len(errors)
+                        errors = []
+                    batch, deadline = [], None
+                    yield json.dumps(ack) + "\n"
+                elif errors and (done or len(errors) >= batch_size):
+                    total_err += len(errors)
+                    yield json.dumps({"batch": None, "accepted": 0, "rejected": errors}) + "\n"
+                    errors = []
+
+                if done:
+                    break
+
+            yield json.dumps({"done": True, "lines": lineno, "accepted": total_ok,
+                              "rejected": total_err, "batches": n_batch}) + "\n"
+        finally:
+            stop.set()
+
+    resp = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    # dilepas saat server menutup response, juga bila generator tidak pernah jalan
+    resp.call_on_close(_close_stream)
+    return resp
+
+
+# ---------- cache pembacaan terakhir: sinkron dengan DB ----------
+# Cache per proses hanya melihat data yang lewat worker itu; snapshot dari DB
+# (satu query groupwise-max, memakai index lokasi_tanam+created_at) diambil
+# paling sering tiap LATEST_RESYNC_SECONDS, dan lokasi yang belum ada di cache
+# dicari langsung ke DB.
+_LATEST_RESULT_COLS = ("status_kesuburan", "rekomendasi", "waktu_tanam_hari", "waktu_tanam_tanggal")
+_resync_at = 0.0
+_resync_lock = threading.Lock()
+
+
+def _latest_select():
+    t = PredictionRecord.__table__.c
+    return db.select(t.id, t.lokasi_tanam, t.created_at,
+                     *[t[c] for c in _LATEST_RESULT_COLS], *[t[c] for c in SENSOR_COLS])
+
+
+def _cache_rows(rows) -> None:
+    for r in rows:
+        m = r._mapping
+        latest_readings.update(
+            m["lokasi_tanam"],
+            {c: m[c] for c in SENSOR_COLS if m[c] is not None},
+            {c: m[c] for c in _LATEST_RESULT_COLS},
+            at=m["created_at"],
+        )
+
+
+def _maybe_resync() -> None:
+    global _resync_at
+    interval = float(current_app.config.get("LATEST_RESYNC_SECONDS", 30))
+    if time.monotonic() < _resync_at or not _resync_lock.acquire(blocking=False):
+        return
+    try:
+        t = PredictionRecord.__table__.c
+        newest = (db.select(t.lokasi_tanam, db.func.max(t.created_at).label("created_at"))
+                  .where(t.lokasi_tanam.isnot(None)).group_by(t.lokasi_tanam).subquery())
+        stmt = (_latest_select()
+                .join(newest, (t.lokasi_tanam == newest.c.lokasi_tanam) & (t.created_at == newest.c.created_at))
+                .order_by(t.id))  # created_at kembar: id terbesar menang
+        _cache_rows(db.session.execute(stmt))
+    except Exception:
+        # DB bermasalah: tetap layani isi cache, coba lagi di interval berikutnya
+        current_app.logger.exception("latest: sinkron cache dari DB gagal")
+    finally:
+        db.session.rollback()
+        _resync_at = time.monotonic() + interval
+        _resync_lock.release()
+
+
+def _latest_from_db(lokasi: str) -> None:
+    t = PredictionRecord.__table__.c
+    stmt = (_latest_select().where(t.lokasi_tanam == lokasi)
+            .order_by(t.created_at.desc(), t.id.desc()).limit(1))
+    _cache_rows(db.session.execute(stmt))
+    db.session.rollback()
+
+
+@ingest_bp.get("/api/latest")
+@login_required
+def api_latest():
+    _maybe_resync()
+    return jsonify(ok=True, latest=latest_readings.snapshot())
+
+
+@ingest_bp.get("/api/latest/<path:lokasi>")
+@login_required
+def api_latest_one(lokasi):
+    _maybe_resync()
+    entry = latest_readings.get(lokasi)
+    if entry is None:
+        _latest_from_db(lokasi)
+        entry = latest_readings.get(lokasi)
+    if entry is None:
+        return jsonify(ok=False, error="Belum ada pembacaan untuk lokasi ini."), 404
+    return jsonify(ok=True, latest=entry)
@@ -0,0 +1,49 @@
+# myapp/latest.py
+import threading
+from datetime import datetime
+
+
+class LatestReadings:
+    """
+    Cache in-memory pembacaan sensor + hasil prediksi terakhir per lokasi_tanam.
+    Dibaca dashboard tanpa query DB. Catatan: cache ini per proses, jadi tiap
+    worker gunicorn punya salinannya sendiri; /api/latest menyinkronkannya
+    dari DB secara berkala (lihat ingest.py) agar data worker lain ikut terlihat.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def update(self, lokasi: str | None, inputs: dict, result: dict, at: datetime | None = None) -> None:
+        if not lokasi:
+            return
+        at = at or datetime.utcnow()
+        entry = {
+            "lokasi_tanam": lokasi,
+            "inputs": dict(inputs or {}),
+            "updated_at": at.isoformat(timespec="seconds"),
+            **result,
+        }
+        with self._lock:
+            prev = self._data.get(lokasi)
+            if prev is None or prev["_at"] <= at:
+                entry["_at"] = at
+                self._data[lokasi] = entry
+
+    def get(self, lokasi: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(lokasi)
+        return _public(entry) if entry else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._data.items())
+        return {k: _public(v) for k, v in items}
+
+
+def _public(entry: dict) -> dict:
+    return {k: v for k, v in entry.items() if not k.startswith("_")}
+
+
+latest_readings = LatestReadings()
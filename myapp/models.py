@@ -19,6 +19,10 @@ def load_user(user_id: str):
 
 class PredictionRecord(db.Model):
     __tablename__ = "prediction_records"
+    __table_args__ = (
+        # dipakai query time-series per lokasi (WHERE lokasi_tanam = ? AND created_at BETWEEN ...)
+        db.Index("ix_prediction_records_lokasi_created", "lokasi_tanam", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
@@ -41,4 +45,10 @@ class PredictionRecord(db.Model):
     waktu_tanam_hari = db.Column(db.Integer, nullable=True)  # kamu minta fixed 120
     waktu_tanam_tanggal = db.Column(db.String(10), nullable=True)
 
-    user = db.relationship("User", backref="predictions", lazy=True)
\ No newline at end of file
+    user = db.relationship("User", backref="predictions", lazy=True)
+
+# kolom sensor PredictionRecord (nilai input yang tersimpan, urutan tetap)
+SENSOR_COLS = (
+    "suhu_udara", "kelembapan_udara", "suhu_tanah", "kelembapan_tanah",
+    "ph_tanah", "nitrogen", "fosfor", "kalium", "curah_hujan",
+)
\ No newline at end of file
@@ -0,0 +1,312 @@
+# myapp/registry.py
+"""
+Registry model: banyak pasangan artefak + metadata, dipilih per lokasi_tanam
+atau lewat key eksplisit, dimuat lazily ke cache LRU berbatas memori.
+
+Isi MODEL_REGISTRY_DIR (default models/registry/):
+    <key>.pkl + <key>.json     artefak joblib + metadata (model_kind, features, classes)
+    routing.json               pemetaan lokasi -> key, contoh:
+        {
+          "default":   {"clf": "default", "reg": "default_days"},
+          "locations": {"Kebun Toba": {"clf": "toba_status", "reg": "toba_days"}}
+        }
+
+Key bawaan "default" (MODEL_PATH / METADATA_PATH) dan "default_days"
+(MODEL_PATH_DAYS / METADATA_PATH_DAYS) selalu ada, jadi tanpa folder
+registry perilakunya sama dengan satu pasangan model seperti sebelumnya.
+
+Ukuran model di cache diestimasi dari ukuran file artefak. Model yang tidak
+pernah diminta tidak dimuat sama sekali.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+from flask import current_app
+
+KINDS = {"classifier": "clf", "regressor": "reg"}
+
+
+class UnknownModel(KeyError):
+    pass
+
+
+def _load_meta(path: str | None) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+class ModelRegistry:
+    def __init__(self, entries: dict, routing: dict, max_bytes: int, max_models: int):
+        """
+        entries: {key: {"kind": "clf"|"reg", "path": ..., "meta_path": ...}}
+        routing: {"default": {"clf": key, "reg": key}, "locations": {lokasi: {...}}}
+        """
+        self.entries = entries
+        self.default = routing.get("default") or {}
+        self.locations = routing.get("locations") or {}
+        self._locations_ci = {k.strip().casefold(): v for k, v in self.locations.items()}
+        self.max_bytes = int(max_bytes)
+        self.max_models = max(1, int(max_models))
+
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._cache = OrderedDict()  # key -> (model, meta, size_bytes)
+        self._pinned = {}            # key -> (model, meta, size_bytes), di luar anggaran LRU
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "evictions": 0, "load_errors": 0}
+        self._load_times = {}  # key -> {"count", "total_s", "last_s"}
+
+    # ---------- pemilihan model ----------
+    def resolve(self, kind: str, lokasi: str | None = None, key: str | None = None) -> str | None:
+        """Urutan: key eksplisit -> routing lokasi -> default. None bila tidak ada."""
+        if key:
+            entry = self.entries.get(key)
+            if entry is None or entry["kind"] != kind:
+                raise UnknownModel(key)
+            return key
+        if lokasi:
+            route = self.locations.get(lokasi) or self._locations_ci.get(lokasi.strip().casefold())
+            if route and route.get(kind) in self.entries:
+                return route[kind]
+        key = self.default.get(kind)
+        return key if key in self.entries else None
+
+    def exists(self, key: str | None) -> bool:
+        entry = self.entries.get(key) if key else None
+        return bool(entry and entry["path"] and os.path.exists(entry["path"]))
+
+    # ---------- cache LRU ----------
+    def get(self, key: str, on_load=None) -> tuple:
+        """
+        Return (model, meta). on_load(model, meta, key) dipanggil sekali
+        setelah model dimuat (validasi / turunan metadata); exception di
+        sana membatalkan pemuatan.
+        """
+        with self._lock:
+            hit = self._pinned.get(key)
+            if hit is not None:
+                self._stats["hits"] += 1
+                return hit[0], hit[1]
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return hit[0], hit[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # pin() bisa memuat key ini selagi kita menunggu key_lock
+                hit = self._pinned.get(key)
+                if hit is not None:
+                    self._stats["hits"] += 1
+                    return hit[0], hit[1]
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return hit[0], hit[1]
+                self._stats["misses"] += 1
+
+            model, meta, size, elapsed = self._load(key, on_load)
+
+            with self._lock:
+                self._cache[key] = (model, meta, size)
+                self._bytes += size
+                self._record_load(key, elapsed)
+                self._evict()
+            return model, meta
+
+    def pin(self, key: str, on_load=None) -> tuple:
+        """
+        Seperti get(), tapi model ditahan di luar anggaran LRU: tidak pernah
+        dibuang dan tidak menggeser model lain dari cache (dipakai model
+        kandidat shadow agar tidak membuat request produksi memuat ulang model).
+        """
+        with self._lock:
+            hit = self._pinned.get(key)
+            if hit is not None:
+                self._stats["hits"] += 1
+                return hit[0], hit[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                item = self._pinned.get(key)
+                if item is not None:
+                    return item[0], item[1]
+                # sudah ada di LRU: pindahkan saja, tanpa memuat ulang
+                item = self._cache.pop(key, None)
+                if item is not None:
+                    self._bytes -= item[2]
+                else:
+                    self._stats["misses"] += 1
+            if item is None:
+                model, meta, size, elapsed = self._load(key, on_load)
+                item = (model, meta, size)
+                with self._lock:
+                    self._record_load(key, elapsed)
+            with self._lock:
+                self._pinned[key] = item
+            return item[0], item[1]
+
+    def _record_load(self, key: str, elapsed: float) -> None:
+        self._stats["loads"] += 1
+        lt = self._load_times.setdefault(key, {"count": 0, "total_s": 0.0, "last_s": 0.0})
+        lt["count"] += 1
+        lt["total_s"] += elapsed
+        lt["last_s"] = elapsed
+
+    def _load(self, key: str, on_load) -> tuple:
+        entry = self.entries.get(key)
+        if entry is None:
+            raise UnknownModel(key)
+        path = entry["path"]
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+
+        t0 = time.perf_counter()
+        try:
+            model = joblib.load(path)
+        except ModuleNotFoundError as e:
+            self._stats["load_errors"] += 1
+            if "xgboost" in str(e).lower():
+                label = "classifier" if entry["kind"] == "clf" else "regressor"
+                raise ModuleNotFoundError(
+                    f"Model {label} membutuhkan paket 'xgboost'. "
+                    "Tambahkan ke requirements & install: pip install xgboost"
+                ) from e
+            raise
+        meta = _load_meta(entry.get("meta_path"))
+        if on_load is not None:
+            try:
+                on_load(model, meta, key)
+            except Exception:
+                self._stats["load_errors"] += 1
+                raise
+        elapsed = time.perf_counter() - t0
+        return model, meta, os.path.getsize(path), elapsed
+
+    def _evict(self) -> None:
+        # model terbaru (paling kanan) tidak pernah dibuang
+        while len(self._cache) > 1 and (
+            len(self._cache) > self.max_models or self._bytes > self.max_bytes
+        ):
+            _, (_, _, size) = self._cache.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            item = self._cache.pop(key, None)
+            if item is None:
+                return False
+            self._bytes -= item[2]
+            self._stats["evictions"] += 1
+            return True
+
+    def footprint(self, deep: bool = False) -> list:
+        """
+        Estimasi memori model di cache. Default: ukuran file artefak (murah);
+        deep=True mengukur ulang lewat pickle.dumps (lambat, alokasi sementara
+        sebesar model).
+        """
+        with self._lock:
+            items = [(k, v[0], v[2], False) for k, v in self._cache.items()]
+            items += [(k, v[0], v[2], True) for k, v in self._pinned.items()]
+        out = []
+        for key, model, size, pinned in items:
+            row = {"key": key, "kind": self.entries[key]["kind"], "type": type(model).__name__,
+                   "pinned": pinned, "file_bytes": size}
+            if deep:
+                try:
+                    row["pickled_bytes"] = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+                except Exception:
+                    row["pickled_bytes"] = None
+            out.append(row)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached": [{"key": k, "bytes": v[2]} for k, v in self._cache.items()],
+                "cached_bytes": self._bytes,
+                "pinned": [{"key": k, "bytes": v[2]} for k, v in self._pinned.items()],
+                "pinned_bytes": sum(v[2] for v in self._pinned.values()),
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models,
+                "load_times": {k: dict(v) for k, v in self._load_times.items()},
+                "available": {k: e["kind"] for k, e in self.entries.items()},
+                "routing": {"default": self.default, "locations": self.locations},
+            }
+
+
+def build_registry(cfg) -> ModelRegistry:
+    """Bangun registry dari config app + isi MODEL_REGISTRY_DIR."""
+    days_path = next(
+        (p for p in (cfg.get("MODEL_PATH_DAYS"), cfg.get("WAKTU_MODEL_PATH"),
+                     "models/waktu_tanam_xgb_reg.pkl", "models/waktu_tanam_rf_reg.pkl")
+         if p and os.path.exists(p)),
+        cfg.get("MODEL_PATH_DAYS"),
+    )
+    entries = {
+        "default": {
+            "kind": "clf",
+            "path": cfg.get("MODEL_PATH", "models/status_rf_clf.pkl"),
+            "meta_path": cfg.get("METADATA_PATH", "models/status_metadata.json"),
+        },
+        "default_days": {
+            "kind": "reg",
+            "path": days_path,
+            "meta_path": cfg.get("METADATA_PATH_DAYS") or "models/waktu_tanam_metadata.json",
+        },
+    }
+    routing = {"default": {"clf": "default", "reg": "default_days"}, "locations": {}}
+
+    reg_dir = cfg.get("MODEL_REGISTRY_DIR")
+    if reg_dir and os.path.isdir(reg_dir):
+        for name in sorted(os.listdir(reg_dir)):
+            key, ext = os.path.splitext(name)
+            if ext != ".pkl":
+                continue
+            meta_path = os.path.join(reg_dir, key + ".json")
+            kind = KINDS.get(_load_meta(meta_path).get("model_kind"))
+            if kind is None:
+                current_app.logger.warning("registry: lewati %s (metadata/model_kind tidak ada)", name)
+                continue
+            entries[key] = {"kind": kind, "path": os.path.join(reg_dir, name), "meta_path": meta_path}
+
+        custom = _load_meta(os.path.join(reg_dir, "routing.json"))
+        routing["default"].update(custom.get("default") or {})
+        routing["locations"].update(custom.get("locations") or {})
+
+    return ModelRegistry(
+        entries, routing,
+        max_bytes=int(float(cfg.get("MODEL_CACHE_MAX_MB", 512)) * 2**20),
+        max_models=int(cfg.get("MODEL_CACHE_MAX_MODELS", 8)),
+    )
+
+
+# ---------- instance per proses ----------
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_registry(current_app.config)
+    return _registry
@@ -0,0 +1,239 @@
+# myapp/rescore.py
+"""
+Rescoring histori prediction_records dengan model yang sedang aktif.
+
+    flask rescore --dry-run                 # hanya hitung berapa label yang berubah
+    flask rescore --workers 4               # tulis ulang, paralel 4 proses
+    flask rescore --resume                  # lanjut dari checkpoint terakhir
+
+Record diproses per rentang id (chunk). Tiap chunk hanya membaca kolom yang
+dibutuhkan, matriks fitur dibangun sekali per chunk lalu di-slice per model
+(routing lokasi di registry), dan hasilnya ditulis dengan satu bulk UPDATE
+berbasis primary key, hanya untuk baris yang berubah.
+
+Checkpoint ditulis oleh proses utama saja: id tertinggi yang semua chunk di
+bawahnya sudah selesai, jadi --resume aman walau jumlah worker diganti.
+"""
+import datetime as dt
+import json
+import os
+import pickle
+import time
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .extensions import db
+from .models import PredictionRecord, SENSOR_COLS
+
+_STATE_COLS = ("id", "lokasi_tanam", "created_at", "status_kesuburan", "rekomendasi",
+               "waktu_tanam_hari", "waktu_tanam_tanggal")
+
+
+def _empty_stats() -> dict:
+    return {"rows": 0, "changed_status": 0, "changed_days": 0, "updated": 0, "transitions": {}}
+
+
+def _merge_stats(total: dict, part: dict) -> dict:
+    for k in ("rows", "changed_status", "changed_days", "updated"):
+        total[k] += part[k]
+    for k, v in part["transitions"].items():
+        total["transitions"][k] = total["transitions"].get(k, 0) + v
+    return total
+
+
+def _start_date(tanggal: str | None, old_days, created_at) -> dt.date:
+    """Tanggal awal = tanggal target lama - hari lama; fallback ke created_at."""
+    if tanggal and old_days is not None:
+        try:
+            return dt.date.fromisoformat(str(tanggal)[:10]) - dt.timedelta(days=int(old_days))
+        except ValueError:
+            pass
+    return (created_at or dt.datetime.utcnow()).date()
+
+
+def rescore_range(lo: int, hi: int, dry_run: bool = False) -> dict:
+    """Skor ulang record dengan lo <= id < hi; butuh app context."""
+    from .dashboard import (
+        _to_db_key, get_status_model, _model_features, _predict_status_batch,
+        get_days_regressor, _predict_days_batch, _rule_waktu_tanam, _build_rekomendasi,
+    )
+    from .registry import get_model_registry
+
+    feat_cols = list(SENSOR_COLS)
+    t = PredictionRecord.__table__.c
+    stmt = (db.select(*[t[c] for c in _STATE_COLS], *[t[c] for c in feat_cols])
+            .where(t.id >= lo, t.id < hi).order_by(t.id))
+    rows = db.session.execute(stmt).all()
+
+    stats = _empty_stats()
+    if not rows:
+        return stats
+    stats["rows"] = len(rows)
+
+    n_state = len(_STATE_COLS)
+    # satu langkah: semua kolom fitur chunk -> float matrix (None -> NaN)
+    M = np.array([r[n_state:] for r in rows], dtype=float).reshape(len(rows), len(feat_cols))
+    col_of = {c: i for i, c in enumerate(feat_cols)}
+
+    registry = get_model_registry()
+    groups = {}
+    for i, r in enumerate(rows):
+        key = (registry.resolve("clf", r.lokasi_tanam), registry.resolve("reg", r.lokasi_tanam))
+        groups.setdefault(key, []).append(i)
+
+    def matrix(sub: np.ndarray, feats: list) -> np.ndarray:
+        # kolom model -> kolom DB; fitur yang tidak ada di tabel jadi NaN
+        cols = [col_of.get(_to_db_key(f), -1) for f in feats]
+        return np.where(np.array(cols) >= 0, sub[:, cols], np.nan)
+
+    updates = []
+    for (ck, rk), idxs in groups.items():
+        clf, meta = get_status_model(model_key=ck)
+        sub = M[idxs]
+
+        labels = _predict_status_batch(clf, matrix(sub, _model_features(clf, meta)), meta)
+        # regressor membaca kolom sesuai daftar fiturnya sendiri
+        reg, reg_meta = get_days_regressor(model_key=rk)
+        if reg is None:
+            days = [_rule_waktu_tanam(lbl) for lbl in labels]
+        else:
+            days = _predict_days_batch(reg, matrix(sub, _model_features(reg, reg_meta)), labels)
+
+        for i, label, d in zip(idxs, labels, days):
+            r = rows[i]
+            d = int(d)
+            status_changed = label != r.status_kesuburan
+            days_changed = d != r.waktu_tanam_hari
+            if status_changed:
+                stats["changed_status"] += 1
+                tkey = f"{r.status_kesuburan} -> {label}"
+                stats["transitions"][tkey] = stats["transitions"].get(tkey, 0) + 1
+            if days_changed:
+                stats["changed_days"] += 1
+            if not (status_changed or days_changed):
+                continue
+            start = _start_date(r.waktu_tanam_tanggal, r.waktu_tanam_hari, r.created_at)
+            updates.append({
+                "id": r.id,
+                "status_kesuburan": label,
+                "rekomendasi": _build_rekomendasi(label, {}),
+                "waktu_tanam_hari": d,
+                "waktu_tanam_tanggal": (start + dt.timedelta(days=d)).isoformat(),
+            })
+
+    if updates and not dry_run:
+        db.session.execute(db.update(PredictionRecord), updates)
+        db.session.commit()
+        stats["updated"] = len(updates)
+    else:
+        db.session.rollback()
+    return stats
+
+
+# ---------- worker proses (spawn, aman juga di Windows) ----------
+_worker_app = None
+
+
+def _init_worker(cfg: dict) -> None:
+    global _worker_app
+    from . import create_app
+    _worker_app = create_app(type("RescoreWorkerConfig", (), cfg))
+
+
+def _work(args: tuple) -> tuple:
+    lo, hi, dry_run = args
+    with _worker_app.app_context():
+        return lo, hi, rescore_range(lo, hi, dry_run)
+
+
+def _picklable_config() -> dict:
+    out = {}
+    for k, v in current_app.config.items():
+        if not k.isupper():
+            continue
+        try:
+            pickle.dumps(v)
+        except Exception:
+            continue
+        out[k] = v
+    return out
+
+
+# ---------- checkpoint ----------
+def _read_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_checkpoint(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)  # atomik: checkpoint tidak pernah setengah tertulis
+
+
+# =================== CLI ===================
+
+@click.command("rescore")
+@click.option("--chunk-size", default=2000, show_default=True, help="Rentang id per chunk.")
+@click.option("--workers", default=1, show_default=True, help="Jumlah proses paralel.")
+@click.option("--checkpoint", default=os.path.join("instance", "rescore_checkpoint.json"),
+              show_default=True, help="File checkpoint (diabaikan saat --dry-run).")
+@click.option("--resume", is_flag=True, help="Lanjut dari checkpoint.")
+@click.option("--dry-run", is_flag=True, help="Jangan tulis apa pun, hanya laporkan perubahan.")
+@with_appcontext
+def rescore_command(chunk_size, workers, checkpoint, resume, dry_run):
+    """Skor ulang prediction_records dengan model saat ini."""
+    chunk_size = max(1, chunk_size)
+    state = _read_checkpoint(checkpoint) if resume else {}
+    start_id = int(state.get("last_id", 0)) + 1
+    totals = state.get("totals") or _empty_stats()
+    if dry_run:
+        totals = _empty_stats()
+
+    t = PredictionRecord.__table__.c
+    max_id = db.session.scalar(db.select(db.func.max(t.id))) or 0
+    db.session.rollback()
+    if start_id > max_id:
+        click.echo(f"Tidak ada record untuk diproses (mulai id {start_id}, max id {max_id}).")
+        return
+
+    ranges = [(lo, min(lo + chunk_size, max_id + 1), dry_run)
+              for lo in range(start_id, max_id + 1, chunk_size)]
+    click.echo(f"Rescore id {start_id}..{max_id}: {len(ranges)} chunk, {workers} worker"
+               f"{' (dry-run)' if dry_run else ''}")
+
+    t0 = time.perf_counter()
+
+    def done(hi: int, part: dict) -> None:
+        _merge_stats(totals, part)
+        if not dry_run:
+            _write_checkpoint(checkpoint, {
+                "last_id": hi - 1,
+                "max_id": max_id,
+                "updated_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+                "totals": totals,
+            })
+        click.echo(f"  s/d id {hi - 1}: {totals['rows']} baris, "
+                   f"{totals['changed_status']} status berubah, {totals['updated']} ditulis "
+                   f"({time.perf_counter() - t0:.1f} s)")
+
+    if workers <= 1:
+        for lo, hi, dr in ranges:
+            done(hi, rescore_range(lo, hi, dr))
+    else:
+        import multiprocessing as mp
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(_picklable_config(),)) as pool:
+            # imap menjaga urutan hasil, jadi checkpoint selalu berupa prefix yang utuh
+            for lo, hi, part in pool.imap(_work, ranges):
+                done(hi, part)
+
+    click.echo(json.dumps({"dry_run": dry_run, **totals}, indent=2, ensure_ascii=False))
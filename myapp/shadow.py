@@ -0,0 +1,303 @@
+# myapp/shadow.py
+"""
+Evaluasi shadow/canary model kandidat di luar jalur request.
+
+Sebagian input (SHADOW_SAMPLE_RATE) dari /api/predict, dashboard dan
+prediksi dimasukkan ke antrean berukuran tetap. Thread latar belakang
+mengambilnya per batch, menskor dengan model kandidat (key registry
+SHADOW_MODEL_KEY / SHADOW_DAYS_MODEL_KEY, di-pin di luar anggaran cache LRU
+sehingga tidak menggeser model produksi), lalu membandingkan dengan label
+& hari produksi. Request tidak pernah menunggu: kalau antrean penuh,
+sampel dibuang dan dihitung sebagai "dropped".
+
+Tanpa regressor kandidat, hari kandidat dihitung dengan regressor hasil
+routing yang sama dengan produksi (lokasi / model_days request), jadi
+selisih hari hanya berasal dari label kandidat.
+
+Statistik dihitung per proses (tiap worker gunicorn punya thread sendiri),
+ditulis ke instance/shadow/ paling sering tiap SHADOW_PUBLISH_SECONDS, dan
+/api/shadow menjumlahkan semua worker (lihat workerstats.py).
+"""
+import queue
+import random
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify
+from flask_login import login_required
+
+from . import workerstats
+from .auth import admin_required
+
+shadow_bp = Blueprint("shadow", __name__)
+
+
+class ShadowEvaluator:
+    def __init__(self, app, model_key: str, days_key: str | None, sample_rate: float,
+                 queue_size: int, batch_size: int, flush_seconds: float, publish_seconds: float = 10.0):
+        self.app = app
+        self.model_key = model_key
+        self.days_key = days_key
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = max(0.01, float(flush_seconds))
+        self.publish_seconds = float(publish_seconds)
+        self._q = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._s = {
+                "sampled": 0, "dropped": 0, "scored": 0, "agree": 0, "errors": 0, "batches": 0,
+                "days_abs_err": 0.0, "days_agree": 0,
+                "prod_latency_s": 0.0, "cand_latency_s": 0.0,
+                "confusion": {},
+            }
+            self._since = time.time()
+
+    # ---------- jalur request: hanya random() + put_nowait ----------
+    def submit(self, vals_model: dict, vals_db: dict, label: str, days, prod_latency_s: float,
+               lokasi: str | None = None, days_key: str | None = None) -> None:
+        if random.random() >= self.sample_rate:
+            return
+        self._ensure_thread()
+        # nama fitur model produksi + nama kolom DB, supaya kandidat dengan
+        # penamaan fitur berbeda tetap menemukan nilainya
+        inputs = {**vals_db, **vals_model}
+        try:
+            self._q.put_nowait((inputs, label, int(days), prod_latency_s, lokasi, days_key))
+            with self._lock:
+                self._s["sampled"] += 1
+        except queue.Full:
+            with self._lock:
+                self._s["dropped"] += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="shadow-eval", daemon=True)
+                    self._thread.start()
+
+    # ---------- thread latar belakang ----------
+    def _run(self) -> None:
+        while True:
+            batch = [self._q.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self.app.app_context():
+                try:
+                    self._score(batch)
+                except Exception:
+                    self.app.logger.exception("shadow: scoring batch gagal")
+                    with self._lock:
+                        self._s["errors"] += len(batch)
+                try:
+                    self.sync()
+                except Exception:
+                    self.app.logger.exception("shadow: tulis statistik worker gagal")
+
+    def sync(self, force: bool = False) -> None:
+        """Tulis statistik worker ini ke instance/shadow/ (butuh app context)."""
+        workerstats.sync("shadow", self.export, self.reset, self.publish_seconds, force=force)
+
+    def _score(self, batch: list) -> None:
+        import numpy as np
+        from .dashboard import (
+            _check_classifier, _model_features, _collect_vals, _predict_status_batch,
+            _days_matrix, _predict_days_batch, _compute_waktu_tanam_batch,
+        )
+        from .registry import get_model_registry
+
+        # kandidat di-pin di luar anggaran LRU: tidak menggeser model produksi
+        registry = get_model_registry()
+        clf, meta = registry.pin(self.model_key, on_load=_check_classifier)
+        reg, reg_meta = registry.pin(self.days_key) if self.days_key else (None, {})
+        srcs = [vals for vals, *_ in batch]
+        feats = _model_features(clf, meta)
+        X = np.array([[_collect_vals(feats, vals).get(n) for n in feats] for vals in srcs], dtype=float)
+
+        t0 = time.perf_counter()
+        labels = _predict_status_batch(clf, X, meta)
+        if reg is not None:
+            days = _predict_days_batch(reg, _days_matrix(reg, reg_meta, srcs), labels)
+        else:
+            # tanpa regressor kandidat: hari dari regressor/aturan produksi atas
+            # label kandidat, dengan routing (lokasi, model_days) tiap sampel
+            days = [None] * len(batch)
+            groups = {}
+            for i, (*_, lokasi, days_key) in enumerate(batch):
+                groups.setdefault((lokasi, days_key), []).append(i)
+            for (lokasi, days_key), idx in groups.items():
+                out = _compute_waktu_tanam_batch(
+                    [labels[i] for i in idx], [srcs[i] for i in idx], lokasi, days_key)
+                for i, d in zip(idx, out):
+                    days[i] = d
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            s = self._s
+            s["batches"] += 1
+            s["cand_latency_s"] += elapsed
+            for (_, prod_label, prod_days, prod_lat, *_), cand_label, cand_days in zip(batch, labels, days):
+                s["scored"] += 1
+                s["prod_latency_s"] += prod_lat
+                s["agree"] += int(cand_label == prod_label)
+                row = s["confusion"].setdefault(prod_label, {})
+                row[cand_label] = row.get(cand_label, 0) + 1
+                s["days_abs_err"] += abs(int(cand_days) - prod_days)
+                s["days_agree"] += int(int(cand_days) == prod_days)
+
+    def export(self) -> dict:
+        """Statistik mentah worker ini (JSON) untuk digabung lintas worker."""
+        with self._lock:
+            s = dict(self._s, confusion={k: dict(v) for k, v in self._s["confusion"].items()})
+            return {
+                "candidate": [self.model_key, self.days_key],
+                "since": self._since,
+                "queue_depth": self._q.qsize(),
+                **s,
+            }
+
+    def merge(self, states: list) -> dict:
+        """Jumlahkan export() beberapa worker; worker dengan kandidat lain dilewati."""
+        out = None
+        for st in states:
+            if st.get("candidate") != [self.model_key, self.days_key]:
+                continue
+            if out is None:
+                out = dict(st, confusion={})
+            else:
+                out["since"] = min(out["since"], st["since"])
+                for k, v in st.items():
+                    if k not in ("candidate", "since", "confusion", "pid", "updated_ts"):
+                        out[k] += v
+            for prod, row in st["confusion"].items():
+                dst = out["confusion"].setdefault(prod, {})
+                for cand, v in row.items():
+                    dst[cand] = dst.get(cand, 0) + v
+        return out or self.export()
+
+    def report(self, state: dict | None = None) -> dict:
+        """state: hasil export()/merge(); default statistik worker ini."""
+        s = state or self.export()
+        since = s["since"]
+        n = s["scored"]
+        return {
+            "candidate": {"model": self.model_key, "days_model": self.days_key},
+            "sample_rate": self.sample_rate,
+            "since": since,
+            "queue_depth": s["queue_depth"],
+            "sampled": s["sampled"],
+            "dropped": s["dropped"],
+            "scored": n,
+            "errors": s["errors"],
+            "batches": s["batches"],
+            "agreement_rate": round(s["agree"] / n, 4) if n else None,
+            "confusion": s["confusion"],  # {label_produksi: {label_kandidat: n}}
+            "days": {
+                "mae": round(s["days_abs_err"] / n, 3) if n else None,
+                "exact_agreement_rate": round(s["days_agree"] / n, 4) if n else None,
+            },
+            "latency_ms": {
+                "production_per_request": round(1000 * s["prod_latency_s"] / n, 3) if n else None,
+                "candidate_per_row": round(1000 * s["cand_latency_s"] / n, 3) if n else None,
+                "candidate_per_batch": round(1000 * s["cand_latency_s"] / s["batches"], 3) if s["batches"] else None,
+            },
+        }
+
+
+# ---------- instance per proses ----------
+_evaluator = None
+_evaluator_error = None
+_evaluator_lock = threading.Lock()
+
+
+def _check_keys(model_key: str, days_key: str | None) -> None:
+    """Validasi SHADOW_*_KEY sekali; ValueError bila key tidak ada / salah jenis / file hilang."""
+    from .registry import get_model_registry, UnknownModel
+
+    registry = get_model_registry()
+    for kind, key, name in (("clf", model_key, "SHADOW_MODEL_KEY"), ("reg", days_key, "SHADOW_DAYS_MODEL_KEY")):
+        if not key:
+            continue
+        try:
+            registry.resolve(kind, key=key)
+        except UnknownModel:
+            raise ValueError(f"{name}={key!r} tidak ada di registry sebagai {kind}") from None
+        if not registry.exists(key):
+            raise ValueError(f"{name}={key!r}: file model tidak ditemukan")
+
+
+def get_shadow_evaluator() -> ShadowEvaluator | None:
+    """None bila SHADOW_MODEL_KEY kosong atau tidak valid (shadow mode mati)."""
+    global _evaluator, _evaluator_error
+    cfg = current_app.config
+    key = (cfg.get("SHADOW_MODEL_KEY") or "").strip()
+    if not key or _evaluator_error:
+        return None
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None and not _evaluator_error:
+                days_key = (cfg.get("SHADOW_DAYS_MODEL_KEY") or "").strip() or None
+                try:
+                    _check_keys(key, days_key)
+                except ValueError as e:
+                    _evaluator_error = str(e)
+                    current_app.logger.error("shadow mode dimatikan: %s", e)
+                    return None
+                _evaluator = ShadowEvaluator(
+                    current_app._get_current_object(),
+                    model_key=key,
+                    days_key=days_key,
+                    sample_rate=cfg.get("SHADOW_SAMPLE_RATE", 0.1),
+                    queue_size=cfg.get("SHADOW_QUEUE_SIZE", 1000),
+                    batch_size=cfg.get("SHADOW_BATCH_SIZE", 64),
+                    flush_seconds=cfg.get("SHADOW_FLUSH_SECONDS", 1.0),
+                    publish_seconds=cfg.get("SHADOW_PUBLISH_SECONDS", 10),
+                )
+    return _evaluator
+
+
+def shadow_submit(vals_model: dict, vals_db: dict, label: str, days, prod_latency_s: float,
+                  lokasi: str | None = None, days_key: str | None = None) -> None:
+    """Hook route prediksi; tidak pernah menggagalkan atau memperlambat request."""
+    try:
+        ev = get_shadow_evaluator()
+        if ev is not None:
+            ev.submit(vals_model, vals_db, label, days, prod_latency_s, lokasi, days_key)
+    except Exception:
+        current_app.logger.exception("shadow submit gagal")
+
+
+# =================== ROUTES ===================
+
+@shadow_bp.get("/api/shadow")
+@login_required
+def api_shadow():
+    ev = get_shadow_evaluator()
+    if ev is None:
+        return jsonify(ok=True, enabled=False, error=_evaluator_error)
+    ev.sync(force=True)
+    states = workerstats.collect("shadow")
+    return jsonify(ok=True, enabled=True, workers=len(states), **ev.report(ev.merge(states)))
+
+
+@shadow_bp.post("/api/shadow/reset")
+@admin_required
+def api_shadow_reset():
+    """Reset statistik semua worker (masing-masing saat sync berikutnya)."""
+    ev = get_shadow_evaluator()
+    if ev is not None:
+        workerstats.request_reset("shadow")
+        ev.sync(force=True)
+    return jsonify(ok=True)
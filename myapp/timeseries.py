@@ -0,0 +1,146 @@
+# myapp/timeseries.py
+"""
+API time-series per lokasi untuk grafik.
+
+Hanya kolom yang diminta yang dibaca (bukan objek PredictionRecord penuh),
+diambil bertahap per batch, lalu di-downsample di server dengan LTTB
+(Largest-Triangle-Three-Buckets) agar bentuk kurva tetap terjaga.
+Respons berbentuk JSON kolumnar: {"t": [epoch_ms...], "y": [nilai...]}.
+"""
+import datetime as dt
+
+import numpy as np
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required
+
+from .extensions import db
+from .models import PredictionRecord, SENSOR_COLS
+
+ts_bp = Blueprint("timeseries", __name__)
+
+# kolom yang boleh diminta sebagai seri
+SERIES_COLS = (*SENSOR_COLS, "waktu_tanam_hari")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets. Kembalikan indeks titik terpilih
+    (selalu memuat titik pertama & terakhir). x harus terurut naik.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nstart, nend = end, min(int((i + 2) * every) + 1, n)
+
+        avg_x = x[nstart:nend].mean()
+        avg_y = y[nstart:nend].mean()
+
+        # luas segitiga (dikali 2, cukup untuk perbandingan)
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def _parse_dt(s: str | None) -> dt.datetime | None:
+    """
+    Terima 'YYYY-MM-DD' atau ISO datetime; None bila kosong, ValueError bila
+    tidak valid. Waktu dengan offset (+07:00, Z) dikonversi ke UTC naif,
+    sama seperti created_at di DB.
+    """
+    if not s or not s.strip():
+        return None
+    value = dt.datetime.fromisoformat(s.strip())
+    if value.tzinfo is not None:
+        value = value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _load_columns(lokasi: str, cols: list, start, end) -> tuple:
+    """
+    Baca (created_at, *cols) untuk satu lokasi secara bertahap (yield_per).
+    Return (t_ms: int64[n], {col: float64[n]}).
+    """
+    t = PredictionRecord.__table__.c
+    stmt = db.select(t.created_at, *[t[c] for c in cols]).where(t.lokasi_tanam == lokasi)
+    if start is not None:
+        stmt = stmt.where(t.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(t.created_at < end)
+    stmt = stmt.order_by(t.created_at)
+
+    fetch = int(current_app.config.get("TIMESERIES_FETCH_SIZE", 5000))
+    result = db.session.execute(stmt.execution_options(yield_per=fetch))
+
+    t_parts, v_parts = [], []
+    for chunk in result.partitions():
+        t_parts.append(np.array([r[0] for r in chunk], dtype="datetime64[ms]").astype(np.int64))
+        # None (sensor kosong) -> NaN
+        v_parts.append(np.array([tuple(r[1:]) for r in chunk], dtype=float))
+
+    if not t_parts:
+        return np.empty(0, dtype=np.int64), {c: np.empty(0) for c in cols}
+    t_ms = np.concatenate(t_parts)
+    values = np.concatenate(v_parts)
+    return t_ms, {c: values[:, i] for i, c in enumerate(cols)}
+
+
+@ts_bp.get("/api/timeseries")
+@login_required
+def api_timeseries():
+    args = request.args
+    lokasi = (args.get("lokasi") or args.get("lokasi_tanam") or "").strip()
+    if not lokasi:
+        return jsonify(ok=False, error="Parameter 'lokasi' wajib diisi."), 400
+
+    fields = [f.strip() for f in (args.get("fields") or "").split(",") if f.strip()]
+    fields = fields or list(SERIES_COLS)
+    unknown = [f for f in fields if f not in SERIES_COLS]
+    if unknown:
+        return jsonify(ok=False, error=f"Kolom tidak dikenal: {', '.join(unknown)}",
+                       allowed=list(SERIES_COLS)), 400
+
+    max_points = int(current_app.config.get("TIMESERIES_MAX_POINTS", 5000))
+    try:
+        points = int(args.get("points", 500))
+    except ValueError:
+        return jsonify(ok=False, error="Parameter 'points' harus berupa bilangan bulat."), 400
+    points = max(3, min(points, max_points))
+
+    try:
+        start, end = _parse_dt(args.get("start")), _parse_dt(args.get("end"))
+    except ValueError:
+        return jsonify(ok=False, error="Parameter 'start'/'end' harus berformat YYYY-MM-DD atau ISO datetime."), 400
+    t_ms, cols = _load_columns(lokasi, fields, start, end)
+
+    series = {}
+    for name, y in cols.items():
+        ok = ~np.isnan(y)
+        tx, yy = t_ms[ok], y[ok]
+        keep = lttb(tx.astype(float), yy, points)
+        series[name] = {
+            "t": tx[keep].tolist(),
+            "y": np.round(yy[keep], 3).tolist(),
+            "raw": int(len(yy)),
+        }
+
+    return jsonify(
+        ok=True,
+        lokasi_tanam=lokasi,
+        start=start.isoformat() if start else None,
+        end=end.isoformat() if end else None,
+        points=points,
+        rows=int(len(t_ms)),
+        series=series,
+    )
@@ -0,0 +1,103 @@
+# myapp/workerstats.py
+"""
+Hitungan per worker gunicorn yang digabung lintas proses (drift, shadow).
+
+Tiap worker menulis state-nya ke instance/<nama>/worker-<pid>-<mulai>.json
+(atomik: tmp + os.replace, pola yang sama dengan instance/diag/) paling
+sering tiap interval, dan endpoint membaca lalu menjumlahkan semua file.
+File worker yang sudah mati tetap dihitung sampai reset berikutnya, karena
+trafiknya memang sudah terjadi.
+
+Reset berlaku untuk semua worker lewat instance/<nama>/reset.json (epoch).
+File dengan "since" lebih lama dari epoch tidak ikut dijumlah dan dihapus;
+worker yang masih hidup me-reset hitungannya sendiri begitu sync berikutnya
+melihat epoch baru.
+"""
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+
+_started = {}  # pid -> ms mulai; pid bisa dipakai ulang oleh worker pengganti
+_next_sync = {}
+_sync_lock = threading.Lock()
+
+
+def _dir(name: str) -> str:
+    return os.path.join(current_app.instance_path, name)
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def reset_epoch(name: str) -> float:
+    data = _read_json(os.path.join(_dir(name), "reset.json"))
+    return float(data.get("epoch", 0)) if data else 0.0
+
+
+def request_reset(name: str) -> float:
+    """Minta semua worker me-reset hitungan <nama>; return epoch reset."""
+    epoch = time.time()
+    _write_json(os.path.join(_dir(name), "reset.json"), {"epoch": epoch, "pid": os.getpid()})
+    return epoch
+
+
+def sync(name: str, export, reset, interval: float, force: bool = False) -> None:
+    """
+    Tulis state worker ini (export() -> dict dengan "since") paling sering
+    tiap interval detik; reset() dulu bila ada epoch reset yang lebih baru.
+    """
+    now = time.monotonic()
+    with _sync_lock:
+        if not force and now < _next_sync.get(name, 0.0):
+            return
+        _next_sync[name] = now + interval
+    state = export()
+    if state["since"] < reset_epoch(name):
+        reset()
+        state = export()
+    pid = os.getpid()
+    started = _started.setdefault(pid, int(time.time() * 1000))
+    _write_json(os.path.join(_dir(name), f"worker-{pid}-{started}.json"),
+                {**state, "pid": pid, "updated_ts": time.time()})
+
+
+def collect(name: str) -> list:
+    """State semua worker sejak reset terakhir."""
+    d = _dir(name)
+    try:
+        names = sorted(os.listdir(d))
+    except FileNotFoundError:
+        return []
+    epoch = reset_epoch(name)
+    out = []
+    for fn in names:
+        if not (fn.startswith("worker-") and fn.endswith(".json")):
+            continue
+        state = _read_json(os.path.join(d, fn))
+        if state is None:
+            continue
+        if state.get("since", 0) < epoch:
+            # hitungan sebelum reset; worker yang masih hidup akan menulis ulang
+            try:
+                os.remove(os.path.join(d, fn))
+            except OSError:
+                pass
+            continue
+        out.append(state)
+    return out
@@ -0,0 +1,104 @@
+# scripts/bench_pdf.py
+"""
+Benchmark export PDF laporan dengan data sintetis (tanpa DB).
+
+    python scripts/bench_pdf.py                 # 10k & 100k baris, renderer streaming
+    python scripts/bench_pdf.py --legacy        # + pembanding: satu Table besar via SimpleDocTemplate
+    python scripts/bench_pdf.py --rows 5000 --mem
+
+--mem memakai tracemalloc untuk puncak alokasi Python (membuat run lebih lambat).
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myapp.dashboard import (  # noqa: E402
+    render_pdf_report, _build_pdf_rows, _auto_col_widths, _pdf_table_style, _draw_footer,
+)
+
+_REKOM = [
+    "Tambah pupuk sesuai kekurangan (N, P, K) dan perbaiki pH",
+    "Pantau dan sesuaikan pupuk jika perlu",
+    "Pertahankan kondisi saat ini",
+]
+_STATUS = ["Kurang Subur", "Sedang", "Sangat Subur"]
+
+
+def synthetic_chunks(n: int, chunk: int = 2000):
+    base = dt.datetime(2025, 1, 1)
+    for start in range(0, n, chunk):
+        rows = []
+        for i in range(start, min(n, start + chunk)):
+            k = i % 3
+            rows.append({
+                "timestamp": (base + dt.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                "lokasi_tanam": f"Blok {i % 17}",
+                "suhu_udara": 20 + (i % 100) / 10,
+                "kelembapan_udara": 60 + (i % 30),
+                "suhu_tanah": 22 + (i % 50) / 10,
+                "kelembapan_tanah": 30 + (i % 40),
+                "ph_tanah": 5 + (i % 20) / 10,
+                "nitrogen": 10 + i % 40,
+                "fosfor": 5 + i % 30,
+                "kalium": 80 + i % 60,
+                "curah_hujan": 100 + i % 200,
+                "status_kesuburan": _STATUS[k],
+                "rekomendasi": _REKOM[k],
+                "waktu_tanam_hari": (120, 90, 45)[k],
+            })
+        yield rows
+
+
+def render_legacy(out, n: int):
+    """Cara lama: semua baris -> satu Table -> SimpleDocTemplate.build."""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table
+
+    rows = [r for chunk in synthetic_chunks(n) for r in chunk]
+    data = _build_pdf_rows(rows)
+    page_size = landscape(A4)
+    doc = SimpleDocTemplate(out, pagesize=page_size, leftMargin=18, rightMargin=18, topMargin=22, bottomMargin=18)
+    tbl = Table(data, colWidths=_auto_col_widths(data, page_size[0] - 36), repeatRows=1)
+    tbl.setStyle(_pdf_table_style())
+    footer = lambda canvas, d: _draw_footer(canvas, d.pagesize, d.page)
+    doc.build([tbl], onFirstPage=footer, onLaterPages=footer)
+
+
+def run(label: str, fn, mem: bool):
+    with tempfile.TemporaryFile() as out:
+        if mem:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        fn(out)
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if mem else None
+        if mem:
+            tracemalloc.stop()
+        size = out.tell()
+    peak_s = f"{peak / 2**20:8.1f} MiB" if peak is not None else "       -"
+    print(f"{label:<28} {elapsed:8.2f} s  peak {peak_s}  pdf {size / 2**20:7.1f} MiB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="*", default=[10_000, 100_000])
+    ap.add_argument("--legacy", action="store_true", help="jalankan juga renderer lama")
+    ap.add_argument("--mem", action="store_true", help="ukur puncak alokasi dengan tracemalloc")
+    ap.add_argument("--rows-per-page", type=int, default=40)
+    args = ap.parse_args()
+
+    for n in args.rows:
+        run(f"streaming {n:>7} baris", lambda out: render_pdf_report(
+            out, synthetic_chunks(n), n, rows_per_page=args.rows_per_page), args.mem)
+        if args.legacy:
+            run(f"legacy    {n:>7} baris", lambda out: render_legacy(out, n), args.mem)
+
+
+if __name__ == "__main__":
+    main()
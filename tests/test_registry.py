@@ -0,0 +1,95 @@
+# tests/test_registry.py
+import threading
+import time
+
+import joblib
+import pytest
+
+from myapp.registry import ModelRegistry, UnknownModel
+
+
+def _registry(tmp_path, keys, max_models=8, max_bytes=2**30):
+    entries = {}
+    for key in keys:
+        path = tmp_path / f"{key}.pkl"
+        joblib.dump({"key": key, "pad": b"x" * 1000}, path)
+        entries[key] = {"kind": "clf", "path": str(path), "meta_path": None}
+    routing = {"default": {"clf": keys[0]}}
+    return ModelRegistry(entries, routing, max_bytes=max_bytes, max_models=max_models)
+
+
+def test_get_caches_and_counts(tmp_path):
+    reg = _registry(tmp_path, ["a"])
+    model, meta = reg.get("a")
+    assert model["key"] == "a" and meta == {}
+    assert reg.get("a")[0] is model
+    st = reg.stats()
+    assert (st["misses"], st["hits"], st["loads"]) == (1, 1, 1)
+
+
+def test_unknown_key(tmp_path):
+    reg = _registry(tmp_path, ["a"])
+    with pytest.raises(UnknownModel):
+        reg.get("zzz")
+
+
+def test_evicts_lru_by_count(tmp_path):
+    reg = _registry(tmp_path, ["a", "b", "c"], max_models=2)
+    reg.get("a")
+    reg.get("b")
+    reg.get("a")  # b jadi yang paling lama tidak dipakai
+    reg.get("c")
+    st = reg.stats()
+    assert [c["key"] for c in st["cached"]] == ["a", "c"]
+    assert st["evictions"] == 1
+
+
+def test_evicts_by_bytes_but_keeps_newest(tmp_path):
+    reg = _registry(tmp_path, ["a", "b"], max_bytes=1)
+    reg.get("a")
+    reg.get("b")
+    st = reg.stats()
+    assert [c["key"] for c in st["cached"]] == ["b"]
+    assert st["cached_bytes"] == st["cached"][0]["bytes"]
+
+
+def test_pinned_is_not_evicted(tmp_path):
+    reg = _registry(tmp_path, ["cand", "a", "b"], max_models=1)
+    cand = reg.pin("cand")[0]
+    reg.get("a")
+    reg.get("b")
+    st = reg.stats()
+    assert [p["key"] for p in st["pinned"]] == ["cand"]
+    assert [c["key"] for c in st["cached"]] == ["b"]
+    assert reg.get("cand")[0] is cand
+
+
+def test_pin_moves_cached_entry_without_reload(tmp_path):
+    reg = _registry(tmp_path, ["a"])
+    model = reg.get("a")[0]
+    assert reg.pin("a")[0] is model
+    st = reg.stats()
+    assert st["loads"] == 1 and st["cached"] == [] and st["cached_bytes"] == 0
+
+
+def test_get_waiting_on_pin_returns_pinned(tmp_path, monkeypatch):
+    reg = _registry(tmp_path, ["cand"])
+    loading = threading.Event()
+    real_load = reg._load
+
+    def slow_load(key, on_load):
+        loading.set()
+        time.sleep(0.2)
+        return real_load(key, on_load)
+
+    monkeypatch.setattr(reg, "_load", slow_load)
+    pinned = {}
+    t = threading.Thread(target=lambda: pinned.setdefault("model", reg.pin("cand")[0]))
+    t.start()
+    assert loading.wait(2)
+    # get() menunggu key_lock yang dipegang pin(), lalu harus memakai hasil pin
+    model = reg.get("cand")[0]
+    t.join()
+    assert model is pinned["model"]
+    st = reg.stats()
+    assert st["loads"] == 1 and st["cached"] == []